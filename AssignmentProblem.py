@@ -7,6 +7,8 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 from functions import q_push_button, combine_arrays_1d_pure, combine_arrays_pure, input_field, int_to_subscript
 from scipy.optimize import linear_sum_assignment
+from solver import Solver
+from dispatcher import dispatcher, engine_names, features
 
 class AssignmentProblem():
     def __init__(self, size_x, size_y):
@@ -193,10 +195,18 @@ class AssignmentProblem():
         self.update_table_size()
         self.write_data_into_input_table()
 
+    def assign(self, engine):
+        cost_matrix = np.array(self.costs, dtype=float)
+        if engine == "network":
+            m, n = cost_matrix.shape
+            plan, _ = Solver(np.ones(m), np.ones(n), cost_matrix).solve_transportation("network")
+            return np.nonzero(plan > 0.5)
+        return linear_sum_assignment(cost_matrix)
+
     def solve(self):
         cost_matrix = np.array(self.costs)
     
-        row_ind, col_ind = linear_sum_assignment(cost_matrix)
+        (row_ind, col_ind), self.dispatch = dispatcher.run("assignment", features(cost_matrix), self.assign)
     
         assignments = list(zip(row_ind, col_ind))
     
@@ -237,6 +247,7 @@ class AssignmentProblem():
         self.solution_table.setSpan(len(to_write), 0, 1, len(to_write[0]))
         item = QTableWidgetItem(f"Общая стоимость: {constants.stringify(self.total_cost)}")
         item.setTextAlignment(Qt.AlignCenter)
+        item.setToolTip(f"{engine_names[self.dispatch['engine']]}: {self.dispatch['reason']}")
         font = item.font()
         font.setPointSize(16)
         item.setFont(font)
@@ -1,11 +1,16 @@
 import constants
+import numpy as np
 from PySide6.QtWidgets import (
     QHBoxLayout, QVBoxLayout, QSpinBox, QVBoxLayout, QLabel,
     QTableWidget, QHeaderView, QTableWidgetItem, QGroupBox, QComboBox,
 )
 from PySide6.QtCore import Qt
-from functions import q_push_button, combine_arrays_1d_pure, combine_arrays_pure, input_field, int_to_subscript
-from scipy.optimize import linprog
+from functions import q_push_button, combine_arrays_1d_pure, combine_arrays_pure, input_field, int_to_subscript, get_solver_options
+from presolve import Presolve
+from highs_model import highspy
+from lp_builder import LPBuilder
+from solve_cache import solve_cache
+from dispatcher import dispatcher, engine_names, features
 
 class LinearProblem():
     def __init__(self, size_x = 3, size_y = 3):
@@ -27,6 +32,7 @@ class LinearProblem():
         self.constraints = [0 for x in range(self.size_x)]
         self.signs = [">=" for x in range(self.size_x)]
         self.total_cost = 0
+        self.model = None
 
         self.solution_table.setEditTriggers(QTableWidget.NoEditTriggers)
         self.solution_table.setStyleSheet("QTableWidget { font-size: 12px; }")
@@ -281,44 +287,75 @@ class LinearProblem():
         self.get_data_from_input_table()
         max = self.table.cellWidget(0, 0).currentText() != "Минимизация"
 
-        if max:
-            for i in range(len(self.function)):
-                self.function[i] = -self.function[i]
-        
-        A_ub = []
-        b_ub = []
-        A_eq = []
-        b_eq = []
-        for i in range(self.size_y):
-            match self.signs[i]:
-                case "<=":
-                    A_ub.append(self.costs[i])
-                    b_ub.append(self.constraints[i])
-                case ">=":
-                    A_ub.append([-x for x in self.costs[i]])
-                    b_ub.append(-self.constraints[i])
-                case "=":
-                    A_eq.append(self.costs[i])
-                    b_eq.append(self.constraints[i])
-                case _:
-                    continue
+        self.builder = LPBuilder("max" if max else "min")
+        self.builder.add_variables(self.size_x, cost=self.function[:self.size_x])
+        self.builder.add_constraints(
+            np.array([row[:self.size_x] for row in self.costs[:self.size_y]], dtype=float),
+            self.signs[:self.size_y],
+            self.constraints[:self.size_y],
+            names=self.variable_names_y[:self.size_y],
+        )
+        problem = self.builder.problem()
+        A = self.builder.matrix()
 
-        if A_eq == []:
-            A_eq = None
-        if b_eq == []:
-            b_eq = None
-        
-        result = linprog(
-            c=self.function,
-            A_ub=A_ub,
-            b_ub=b_ub,
-            A_eq=A_eq,
-            b_eq=b_eq,
-            bounds=[(0, None) for x in range(self.size_x)],
-            method='highs'
+        options = get_solver_options()
+        key = solve_cache.key(
+            "linear", problem["c"], A.indptr, A.indices, A.data, self.builder.rhs, "".join(self.builder.senses), options.as_dict()
         )
+        hit = solve_cache.get(key)
+        self.dispatch = None
+        self.presolve = None
+        if hit is None:
+            resume = False
+            # Presolve runs on every solve, for its report and to stop at a
+            # contradiction before HiGHS. The persistent model still gets the
+            # whole problem, so later edits are synced into it and its basis
+            # is reused; HiGHS then presolves a cold solve on its own.
+            self.presolve = Presolve(**problem, reduce=options.presolve)
+            if self.presolve.infeasible:
+                solve = None
+                result = self.presolve.linprog(options)
+            elif highspy is None:
+                solve = lambda engine: self.presolve.linprog(options, engine)
+            else:
+                # The model of the previous solve is only changed where the data differ, so HiGHS starts from its basis.
+                if self.model is None or not self.builder.sync(self.model):
+                    self.model = self.builder.model(options)
+                self.model.options = options
+                solve = self.model.solve
+                # Rows appended to a solved model keep its basis dual feasible, so the dual simplex goes on from it.
+                resume = self.model.added and self.model.has_basis
+            if resume:
+                cold = self.model.cold
+                result = self.model.solve("highs-ds")
+                self.dispatch = {
+                    "engine": "highs-ds",
+                    "reason": f"добавлено ограничений: {self.model.added}, решение продолжено от прошлого базиса",
+                    "resumed": (self.model.iterations, self.model.seconds) + cold,
+                }
+            elif solve is not None:
+                choice = None if options.method == "auto" else (options.linprog_method, "задан в настройках")
+                result, self.dispatch = dispatcher.run("linear", features(problem["c"], A=A), solve, choice=choice)
+            if self.dispatch is not None:
+                self.dispatch["options"] = options.as_dict()
+            hit = result.x, result.fun
+            if result.status == 0:
+                # The stored vector is the plan followed by the reduced costs and the row marginals.
+                hit = np.concatenate([result.x, result.lower.marginals, result.ineqlin.marginals, result.eqlin.marginals]), result.fun
+                solve_cache.put(key, *hit)
+        solution, fun = hit
+        x = solution if solution is None else solution[:self.size_x]
+
+        # Marginals of the minimized function, turned into the change of the
+        # user's extremum per unit of each right-hand side.
+        reduced_costs, duals = None, {}
+        if solution is not None:
+            ub = 0 if problem["A_ub"] is None else problem["A_ub"].shape[0]
+            reduced_costs = self.builder.reduced_costs(solution[self.size_x:2 * self.size_x])
+            marginals = self.builder.row_marginals(solution[2 * self.size_x:2 * self.size_x + ub], solution[2 * self.size_x + ub:])
+            duals = dict(enumerate(marginals))
         
-        answer = [-result.fun if max else result.fun, result.x]
+        answer = [-fun if max else fun, x]
         
         to_write = [self.variable_names]
         to_write.append([])
@@ -345,12 +382,39 @@ class LinearProblem():
                     font.setPointSize(16)
                     item.setFont(font)
 
+                if y == 1 and reduced_costs is not None:
+                    item.setToolTip(f"Приведённая стоимость: {reduced_costs[x]:g}")
+
                 item.setTextAlignment(Qt.AlignCenter)
                 self.solution_table.setItem(y, x, item)
         
         self.solution_table.setSpan(len(to_write), 0, 1, len(to_write[0]))
         item = QTableWidgetItem(f"Экстремум функции: {constants.stringify(answer[0])}")
         item.setTextAlignment(Qt.AlignCenter)
+        tooltip = []
+        if duals:
+            tooltip.append("Двойственные оценки:\n" + "\n".join(
+                f"{self.variable_names_y[i]}: {dual:g}" for i, dual in duals.items()
+            ))
+        if self.presolve is not None and options.presolve:
+            (rows, reduced_rows), (columns, reduced_columns) = self.presolve.stats["rows"], self.presolve.stats["columns"]
+            # With highspy the whole problem goes to the persistent model, the counts are only a diagnostic.
+            removed = "удалено" if highspy is None else "можно удалить (решалась полная задача)"
+            tooltip.append(
+                "Предварительная обработка: задача несовместна" if self.presolve.infeasible else
+                f"Предварительная обработка: {removed} ограничений {rows - reduced_rows} из {rows}, "
+                f"переменных {columns - reduced_columns} из {columns}"
+            )
+        if self.dispatch is not None:
+            tooltip.append(f"{engine_names[self.dispatch['engine']]}: {self.dispatch['reason']}")
+            if "resumed" in self.dispatch:
+                iterations, seconds, cold_iterations, cold_seconds = self.dispatch["resumed"]
+                tooltip.append(
+                    f"Итераций: {iterations} за {seconds:.3g} с, последнее решение с нуля заняло {cold_iterations} итераций "
+                    f"за {cold_seconds:.3g} с; сэкономлено {cold_seconds - seconds:.3g} с"
+                )
+        if tooltip:
+            item.setToolTip("\n\n".join(tooltip))
 
         font = item.font()
         font.setPointSize(16)
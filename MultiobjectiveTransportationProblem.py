@@ -4,9 +4,10 @@ from PySide6.QtWidgets import (
     QTableWidget, QHeaderView, QTableWidgetItem, QGroupBox
 )
 from PySide6.QtCore import Qt
-from functions import q_push_button, combine_arrays_1d_pure, combine_arrays_pure, input_field
+from functions import q_push_button, combine_arrays_1d_pure, combine_arrays_pure, input_field, get_solver_options
 from functions import brushes
 from solver import Solver
+from solve_cache import solve_cache
 class MultiobjectiveTransportationProblem():
     def __init__(self, size_x, size_y):
         self.table = QTableWidget()
@@ -253,7 +254,7 @@ class MultiobjectiveTransportationProblem():
     def solve(self):
         self.get_data_from_input_table()
         
-        problem = Solver(self.supply, self.demand, self.costs)
+        problem = Solver(self.supply, self.demand, self.costs, cache=solve_cache, options=get_solver_options())
         result_matrix, self.total_cost, info = problem.solve_transportation_scipy_double()
 
         size_y = 2 + 2 * len(result_matrix)
@@ -1,10 +1,11 @@
 import sqlite3
 import json
+import numpy as np
 from typing import Dict, Any, List, Optional
 
 class ProblemDatabase:
-    def __init__(self, db_name: str = "problems.db"):
-        self.conn = sqlite3.connect(db_name)
+    def __init__(self, db_name: str = "problems.db", check_same_thread: bool = True):
+        self.conn = sqlite3.connect(db_name, check_same_thread=check_same_thread)
         self.cursor = self.conn.cursor()
         self._create_tables()
 
@@ -58,6 +59,26 @@ class ProblemDatabase:
             demand_json TEXT NOT NULL
         )
         """)
+
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS solve_cache (
+            key TEXT PRIMARY KEY,
+            shape_json TEXT NOT NULL,
+            plan BLOB NOT NULL,
+            objective REAL NOT NULL,
+            used INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS solve_timings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            engine TEXT NOT NULL,
+            size_class INTEGER NOT NULL,
+            seconds REAL NOT NULL
+        )
+        """)
         self.conn.commit()
 
     def _get_table_name(self, problem_type: str) -> str:
@@ -355,6 +376,65 @@ class ProblemDatabase:
             print(f"Database error: {e}")
             return []
 
+    def read_solution(self, key: str) -> Optional[tuple]:
+        try:
+            self.cursor.execute("SELECT shape_json, plan, objective FROM solve_cache WHERE key = ?", (key,))
+            row = self.cursor.fetchone()
+            if not row:
+                return None
+
+            shape, plan, objective = row
+            self.cursor.execute(
+                "UPDATE solve_cache SET used = (SELECT MAX(used) + 1 FROM solve_cache) WHERE key = ?", (key,)
+            )
+            self.conn.commit()
+            return np.frombuffer(plan, dtype=np.float64).reshape(json.loads(shape)), objective
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return None
+
+    def save_solution(self, key: str, plan: np.ndarray, objective: float, max_bytes: Optional[int] = None) -> bool:
+        """Store a plan; with max_bytes the least recently used plans are deleted until the table fits."""
+        try:
+            self.cursor.execute(
+                "INSERT OR REPLACE INTO solve_cache (key, shape_json, plan, objective, used) "
+                "VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(used), 0) + 1 FROM solve_cache))",
+                (key, json.dumps(plan.shape), np.ascontiguousarray(plan, dtype=np.float64).tobytes(), objective)
+            )
+            if max_bytes is not None:
+                self.cursor.execute("""
+                DELETE FROM solve_cache WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(length(plan) + length(key)) OVER (ORDER BY used DESC) AS total FROM solve_cache
+                    ) WHERE total > ?
+                )
+                """, (max_bytes,))
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return False
+
+    def read_timings(self) -> List[tuple]:
+        try:
+            self.cursor.execute("SELECT kind, engine, size_class, seconds FROM solve_timings")
+            return self.cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return []
+
+    def save_timing(self, kind: str, engine: str, size_class: int, seconds: float) -> bool:
+        try:
+            self.cursor.execute(
+                "INSERT INTO solve_timings (kind, engine, size_class, seconds) VALUES (?, ?, ?, ?)",
+                (kind, engine, size_class, seconds)
+            )
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return False
+
     def close(self):
         self.conn.close()
 
@@ -1,11 +1,15 @@
 import constants
+import numpy as np
 from PySide6.QtWidgets import (
     QHBoxLayout, QVBoxLayout, QSpinBox, QVBoxLayout, QLabel,
-    QTableWidget, QHeaderView, QTableWidgetItem, QGroupBox
+    QTableWidget, QHeaderView, QTableWidgetItem, QGroupBox, QComboBox, QApplication
 )
 from PySide6.QtCore import Qt
-from functions import q_push_button, combine_arrays_1d_pure, combine_arrays_pure, input_field, int_to_subscript
+from functions import q_push_button, combine_arrays_1d_pure, combine_arrays_pure, input_field, int_to_subscript, get_solver_options
 from solver import Solver
+from solve_cache import solve_cache
+from dispatcher import dispatcher, engine_names
+from network_simplex import initial_solution_names
 
 class TransportationProblem():
     def __init__(self, size_x, size_y):
@@ -20,6 +24,7 @@ class TransportationProblem():
         self.supply = [0 for y in range(self.size_y)]
         self.demand = [0 for x in range(self.size_x)]
         self.total_cost = 0
+        self.solver = None
         self.supply_labels =  [f"Поставщик {x}" for x in range(1, self.size_y + 1)] + ["Потребители"]
         self.demand_labels = [f"Потребитель {x}" for x in range(1, self.size_x + 1)] + ["Поставщики"]
 
@@ -68,6 +73,15 @@ class TransportationProblem():
         self.dest_spin.setValue(self.size_x)
         self.dest_spin.valueChanged.connect(self.update_input_table)
         self.dest_layout.addWidget(self.dest_spin)
+
+        self.initial_layout = QVBoxLayout()
+        self.initial_layout.setSpacing(0)
+        self.initial_layout.addWidget(QLabel("Начальный план:"))
+        self.initial_combo = QComboBox()
+        for rule, name in initial_solution_names.items():
+            self.initial_combo.addItem(name, rule)
+        self.initial_combo.setCurrentIndex(self.initial_combo.findData("vogel"))
+        self.initial_layout.addWidget(self.initial_combo)
         
         self.menu_btn = q_push_button("Меню", constants.solve_btn)
         self.solve_btn = q_push_button("Решить", constants.solve_btn)
@@ -87,6 +101,7 @@ class TransportationProblem():
         self.control_layout.addWidget(self.menu_btn)
         self.control_layout.addLayout(self.source_layout)
         self.control_layout.addLayout(self.dest_layout)
+        self.control_layout.addLayout(self.initial_layout)
         self.control_layout.addWidget(self.variable_field_x)
         self.control_layout.addWidget(self.variable_btn_x)
         self.control_layout.addWidget(self.variable_field_y)
@@ -214,6 +229,25 @@ class TransportationProblem():
         self.update_table_size()
         self.write_data_into_input_table()
 
+    def sensitivity_tooltip(self, sensitivity, i, j):
+        """What-if hints of a solution table cell: source i, destination j, -1 for the name cells."""
+        m, n = sensitivity.shape
+        stringify = lambda value: "∞" if value == float("inf") else "-∞" if value == -float("inf") else f"{value:g}"
+        if 0 <= i < m and 0 <= j < n:
+            low, high = sensitivity.cost_range(i, j)
+            return (f"Тариф {stringify(sensitivity.costs[i, j])}: план оптимален при тарифе "
+                    f"от {stringify(low)} до {stringify(high)}\n"
+                    f"Оценка маршрута: {stringify(sensitivity.reduced_costs[i, j])}")
+        if 0 <= i < m and j == -1:
+            low, high = sensitivity.supply_range(i)
+            return (f"Потенциал: {stringify(sensitivity.u[i])} за единицу запаса\n"
+                    f"Действует при запасе от {stringify(low)} до {stringify(high)}")
+        if i == -1 and 0 <= j < n:
+            low, high = sensitivity.demand_range(j)
+            return (f"Потенциал: {stringify(sensitivity.v[j])} за единицу потребности\n"
+                    f"Действует при потребности от {stringify(low)} до {stringify(high)}")
+        return None
+
     def solve(self):
         self.get_data_from_input_table()
         costs, supply, demand = self.costs, self.supply, self.demand
@@ -222,8 +256,34 @@ class TransportationProblem():
         demand = demand[0:self.size_x]
         costs = [row[0:self.size_x] for row in costs[0:self.size_y]]
 
-        problem = Solver(supply, demand, costs)
-        result_matrix, self.total_cost = problem.solve_transportation_scipy()
+        if self.solver is None:
+            self.solver = Solver(supply, demand, costs, cache=solve_cache, dispatcher=dispatcher)
+        else:
+            self.solver.supply_vector, self.solver.demand_vector, self.solver.cost_matrix = supply, demand, costs
+        self.solver.options = get_solver_options()
+
+        method, reason = self.solver.choose_method()
+        if method != "network":
+            result_matrix, self.total_cost = self.solver.solve_transportation_auto(self.initial_combo.currentData(), choice=(method, reason))
+            self.show_solution(result_matrix, supply, demand, sensitivity=self.solver.analysis)
+            return
+
+        # Improving plans are shown while the simplex works, the window keeps responding.
+        self.solve_btn.setEnabled(False)
+        try:
+            for result_matrix, self.total_cost, gap in self.solver.solve_transportation_progressive(self.initial_combo.currentData()):
+                self.show_solution(result_matrix, supply, demand, gap)
+                QApplication.processEvents()
+        finally:
+            self.solve_btn.setEnabled(True)
+        self.solver.dispatch = {"engine": method, "reason": reason, "options": self.solver.options.as_dict()}
+        self.show_solution(result_matrix, supply, demand, sensitivity=self.solver.analysis)
+
+    def show_solution(self, result_matrix, supply, demand, gap=0, sensitivity=None):
+        if self.solver.surplus == "supply":
+            result_matrix = np.column_stack([result_matrix, np.asarray(supply) - result_matrix.sum(axis=1)])
+        if self.solver.surplus == "demand":
+            result_matrix = np.vstack([result_matrix, np.asarray(demand) - result_matrix.sum(axis=0)])
 
         sources = len(result_matrix)
         destinations = len(result_matrix[0]) if sources > 0 else 0
@@ -257,11 +317,20 @@ class TransportationProblem():
                 val = val.replace('-', '')
                 item = QTableWidgetItem(val)
                 item.setTextAlignment(Qt.AlignCenter)
+                tooltip = sensitivity and self.sensitivity_tooltip(sensitivity, y - 1, x - 1)
+                if tooltip:
+                    item.setToolTip(tooltip)
 
                 self.solution_table.setItem(y, x, item)
         
         self.solution_table.setSpan(len(to_write), 0, 1, len(to_write[0]))
-        item = QTableWidgetItem(f"Общая стоимость: {constants.stringify(self.total_cost)}")
+        text = f"Общая стоимость: {constants.stringify(self.total_cost)}"
+        if gap > 0:
+            text += f" (поиск продолжается, до оптимума не больше {gap:.6g})"
+        item = QTableWidgetItem(text)
         item.setTextAlignment(Qt.AlignCenter)
+        if gap == 0 and self.solver.dispatch is not None:
+            dispatch = self.solver.dispatch
+            item.setToolTip(f"{engine_names.get(dispatch['engine'], dispatch['engine'])}: {dispatch['reason']}")
 
         self.solution_table.setItem(len(to_write), 0, QTableWidgetItem(item))
@@ -488,8 +488,9 @@ class UserInterface(QMainWindow):
         match self.problem_type:
             case "Транспортная задача":
                 self.transportation_problem.solution_table.clearSpans()
+                self.solution_table.setCurrentWidget(self.transportation_problem.solution_table)
+                self.show_solution_page()
                 self.transportation_problem.solve()
-                self.solution_table.setCurrentWidget(self.transportation_problem.solution_table) 
             case "Задача о назначениях":
                 self.assignment_problem.solution_table.clearSpans()
                 self.assignment_problem.solve()
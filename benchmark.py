@@ -0,0 +1,483 @@
+import os
+import sys
+import time
+import resource
+import multiprocessing
+import numpy as np
+from scipy.optimize import linprog
+from solver import Solver, transport_constraints, transport_rows
+from presolve import Presolve
+from highs_model import LPModel
+from solver_options import SolverOptions
+from lp_builder import LPBuilder
+from dispatcher import Dispatcher, engines, approximate_engines, features
+from network_simplex import initial_solutions
+from ProblemDatabase import ProblemDatabase
+
+
+def dense_transport_constraints(m, n):
+    A_eq = []
+    for i in range(m):
+        row = np.zeros((m, n))
+        row[i, :] = 1
+        A_eq.append(row.flatten())
+    for j in range(n):
+        col = np.zeros((m, n))
+        col[:, j] = 1
+        A_eq.append(col.flatten())
+    return np.array(A_eq)
+
+
+def _measure(queue, function, args):
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def measure(function, *args):
+    """Run function in a fresh process, return (seconds, peak RSS in MB)."""
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(queue, function, args))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def clustered_transportation(m, n, sites=20, seed=0):
+    """Sources and destinations scattered around a few sites, costs are the distances."""
+    rng = np.random.default_rng(seed)
+    centers = rng.random((sites, 2)) * 1000
+    sources = centers[rng.integers(sites, size=m)] + rng.normal(0, 40, (m, 2))
+    destinations = centers[rng.integers(sites, size=n)] + rng.normal(0, 40, (n, 2))
+    costs = np.rint(np.linalg.norm(sources[:, None] - destinations[None], axis=2))
+    supply = rng.integers(1, 50, m).astype(float)
+    demand = np.floor(rng.integers(1, 50, n) * supply.sum() / (25 * n))
+    return supply, demand, costs
+
+
+def bench_assembly(sizes=(50, 100, 200, 400, 1000, 2000), dense_limit=400):
+    print(f"{'size':>10}  {'sparse, s':>10}  {'sparse, MB':>10}  {'dense, s':>10}  {'dense, MB':>10}")
+    for size in sizes:
+        sparse_time, sparse_rss = measure(transport_constraints, size, size)
+        if size <= dense_limit:
+            dense_time, dense_rss = measure(dense_transport_constraints, size, size)
+            dense = f"{dense_time:>10.3f}  {dense_rss:>10.1f}"
+        else:
+            dense = f"{'-':>10}  {'-':>10}"
+        print(f"{size:>4}x{size:<5}  {sparse_time:>10.3f}  {sparse_rss:>10.1f}  {dense}")
+
+
+def random_transportation(m, n, seed=0):
+    rng = np.random.default_rng(seed)
+    costs = rng.integers(1, 100, (m, n)).astype(float)
+    supply = rng.integers(1, 50, m).astype(float)
+    demand = rng.integers(1, 50, n).astype(float)
+    return supply, demand, costs
+
+
+def bench_engines(sizes=((50, 50), (100, 100), (200, 200), (300, 300))):
+    print(f"{'size':>10}  {'scipy, s':>10}  {'network, s':>10}  {'pivots':>8}  {'cost':>10}")
+    for m, n in sizes:
+        supply, demand, costs = random_transportation(m, n)
+        start = time.perf_counter()
+        _, scipy_cost = Solver(supply.copy(), demand.copy(), costs).solve_transportation("scipy")
+        scipy_time = time.perf_counter() - start
+
+        solver = Solver(supply.copy(), demand.copy(), costs)
+        start = time.perf_counter()
+        _, network_cost = solver.solve_transportation("network")
+        network_time = time.perf_counter() - start
+        assert abs(scipy_cost - network_cost) < 1e-6 * max(1, abs(scipy_cost))
+        print(f"{m:>4}x{n:<5}  {scipy_time:>10.3f}  {network_time:>10.3f}  {solver.engine.iterations:>8}  {network_cost:>10g}")
+
+
+def bench_initial_solutions(db_name="problems.db"):
+    with ProblemDatabase(db_name) as pdb:
+        problems = list(pdb.get_all_problems("Транспортная задача").values())
+
+    gaps = {rule: [] for rule in initial_solutions}
+    times = {rule: 0.0 for rule in initial_solutions}
+    pivots = {rule: 0 for rule in initial_solutions}
+    for problem in problems:
+        data = problem["supply"], problem["demand"], np.array(problem["costs"], dtype=float)
+        _, optimum = Solver(*data).solve_transportation("scipy")
+        for rule in initial_solutions:
+            start = time.perf_counter()
+            _, cost, _ = Solver(*data).initial_solution(rule)
+            times[rule] += time.perf_counter() - start
+            gaps[rule].append((cost - optimum) / optimum * 100)
+
+            solver = Solver(*data)
+            solver.solve_transportation("network", rule)
+            pivots[rule] += solver.engine.iterations
+
+    print(f"{len(problems)} problems from {db_name}")
+    print(f"{'rule':>10}  {'mean gap, %':>12}  {'max gap, %':>12}  {'mean time, ms':>14}  {'pivots':>8}")
+    for rule in initial_solutions:
+        print(f"{rule:>10}  {np.mean(gaps[rule]):>12.2f}  {np.max(gaps[rule]):>12.2f}  "
+              f"{times[rule] / len(problems) * 1000:>14.3f}  {pivots[rule]:>8}")
+
+
+def bench_warm_start(size=400, edits=20, seed=1):
+    supply, _, costs = random_transportation(size, size)
+    demand = supply[::-1].copy()
+    solver = Solver(supply.copy(), demand.copy(), costs.copy())
+    start = time.perf_counter()
+    solver.solve_transportation("network")
+    print(f"{size}x{size}: cold solve {time.perf_counter() - start:.3f} s, {solver.engine.iterations} pivots")
+
+    rng = np.random.default_rng(seed)
+    for kind in ("cost", "supply"):
+        elapsed = []
+        for _ in range(edits):
+            pivots = solver.engine.iterations
+            if kind == "cost":
+                solver.cost_matrix[rng.integers(size), rng.integers(size)] = rng.integers(1, 100)
+            else:
+                i, k = rng.choice(size, 2, replace=False)
+                amount = min(rng.integers(1, 10), solver.supply_vector[k])
+                solver.supply_vector[i] += amount
+                solver.supply_vector[k] -= amount
+            start = time.perf_counter()
+            solver.solve_transportation("network")
+            elapsed.append(time.perf_counter() - start)
+        print(f"single {kind} edit: median {np.median(elapsed) * 1000:.1f} ms, "
+              f"max {np.max(elapsed) * 1000:.1f} ms, {solver.engine.iterations - pivots} pivots on the last edit")
+
+
+def bench_batch(k=200, m=60, n=60):
+    supply, demand, costs = random_transportation(m, n)
+    rng = np.random.default_rng(2)
+    batch = costs * rng.uniform(0.5, 1.5, (k, m, n))
+
+    start = time.perf_counter()
+    loop_costs = [Solver(supply.copy(), demand.copy(), c).solve_transportation_scipy()[1] for c in batch]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    X, batch_costs = Solver.solve_batch(batch, supply, demand)
+    batch_time = time.perf_counter() - start
+    assert X.shape == (k, m, n) and np.allclose(loop_costs, batch_costs)
+    print(f"{k} problems {m}x{n}: Solver loop {loop_time:.2f} s, solve_batch {batch_time:.2f} s ({os.cpu_count()} CPUs)")
+
+
+def bench_capacities(size=1000):
+    supply, demand, costs = random_transportation(size, size)
+    rng = np.random.default_rng(3)
+    time_vector = rng.integers(1, 4, size)
+    speed_matrix = rng.integers(0, 6, (size, size))
+
+    solver = Solver(supply.copy(), demand.copy(), costs, time_vector=time_vector, speed_matrix=speed_matrix)
+    start = time.perf_counter()
+    solver.route_limits()
+    print(f"{size}x{size} routes: route bounds built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    for method in ("scipy", "network"):
+        solver = Solver(supply.copy(), demand.copy(), costs, time_vector=time_vector, speed_matrix=speed_matrix)
+        start = time.perf_counter()
+        _, cost = solver.solve_transportation(method)
+        pivots = f", {solver.engine.iterations} pivots" if solver.engine else ""
+        print(f"{method:>8}: {time.perf_counter() - start:.2f} s, cost {cost:g}{pivots}")
+
+
+def bench_route_bounds(size=300, counts=(1, 100, 10000)):
+    supply, demand, costs = random_transportation(size, size)
+    demand = supply[::-1].copy()
+    rng = np.random.default_rng(4)
+    for count in counts:
+        routes = rng.choice(size * size, count, replace=False)
+        route_bounds = {(int(r // size), int(r % size)): (0, int(rng.integers(1, 20))) for r in routes}
+        # Costs below 1 as well: the penalty of the artificial routes once turned them all into 0.
+        for scale in (1, 1 / (costs.max() + 1)):
+            results = {}
+            for method in ("scipy", "network"):
+                solver = Solver(supply.copy(), demand.copy(), costs * scale, route_bounds=route_bounds)
+                start = time.perf_counter()
+                _, results[method] = solver.solve_transportation(method)
+                print(f"{count:>6} bounded routes, costs x{scale:<8.3g} {method:>8}: {time.perf_counter() - start:.3f} s, cost {results[method]:g}")
+            assert abs(results["scipy"] - results["network"]) < 1e-6 * max(1, abs(results["scipy"]))
+
+
+def bench_columns(sizes=((300, 300), (600, 600), (1000, 1000)), large=(4000, 4000)):
+    print(f"{'size':>10}  {'full, s':>10}  {'columns, s':>10}  {'routes':>8}  {'rounds':>6}  {'cost':>10}")
+    for m, n in sizes + (large,):
+        supply, demand, costs = random_transportation(m, n)
+        if (m, n) != large:
+            start = time.perf_counter()
+            _, full_cost = Solver(supply.copy(), demand.copy(), costs).solve_transportation("scipy")
+            full = f"{time.perf_counter() - start:>10.2f}"
+        else:
+            full, full_cost = f"{'-':>10}", None
+
+        solver = Solver(supply.copy(), demand.copy(), costs)
+        start = time.perf_counter()
+        _, cost = solver.solve_transportation("columns")
+        columns_time = time.perf_counter() - start
+        info = solver.column_generation
+        assert full_cost is None or abs(full_cost - cost) < 1e-6 * max(1, cost)
+        assert info["lower_bound"] >= cost - 1e-6 * max(1, cost)
+        print(f"{m:>4}x{n:<5}  {full}  {columns_time:>10.2f}  {info['routes']:>8}  {info['rounds']:>6}  {cost:>10g}")
+
+
+def bench_parametric(size=200, points=50, share=0.3):
+    supply, demand, costs = random_transportation(size, size)
+    rng = np.random.default_rng(5)
+    delta = costs * (rng.random((size, size)) < share)
+
+    solver = Solver(supply.copy(), demand.copy(), costs)
+    start = time.perf_counter()
+    breakpoints, plans, curve = solver.solve_transportation_parametric(delta, 0, 2)
+    sweep_time = time.perf_counter() - start
+
+    grid = np.linspace(0, 2, points)
+    start = time.perf_counter()
+    loop = [Solver(supply.copy(), demand.copy(), costs + t * delta).solve_transportation_scipy()[1] for t in grid]
+    loop_time = time.perf_counter() - start
+    assert np.allclose(np.interp(grid, breakpoints, curve), loop)
+    print(f"{size}x{size}, multiplier on {share:.0%} of routes, t in [0, 2]: sweep {sweep_time:.2f} s "
+          f"({len(plans)} plans, {solver.engine.iterations} pivots), {points} scipy solves {loop_time:.2f} s")
+
+
+def bench_sinkhorn(sizes=((500, 500), (1000, 1000), (5000, 5000)), exact_limit=1000):
+    print(f"{'size':>10}  {'dtype':>8}  {'sinkhorn, s':>11}  {'cost':>10}  {'bound gap, %':>12}  {'exact, s':>8}  {'true gap, %':>11}")
+    for m, n in sizes:
+        supply, demand, costs = random_transportation(m, n)
+        exact = exact_time = None
+        if m <= exact_limit:
+            start = time.perf_counter()
+            _, exact = Solver(supply.copy(), demand.copy(), costs).solve_transportation("network")
+            exact_time = time.perf_counter() - start
+        for dtype in (np.float32, np.float64):
+            solver = Solver(supply.copy(), demand.copy(), costs)
+            start = time.perf_counter()
+            _, cost = solver.solve_transportation_sinkhorn(dtype=dtype)
+            elapsed = time.perf_counter() - start
+            bound_gap = solver.sinkhorn["gap"] / cost * 100
+            exact_columns = (f"{exact_time:>8.2f}  {(cost - exact) / exact * 100:>11.3f}" if exact is not None
+                             else f"{'-':>8}  {'-':>11}")
+            print(f"{m:>4}x{n:<5}  {dtype.__name__:>8}  {elapsed:>11.2f}  {cost:>10.1f}  {bound_gap:>12.3f}  {exact_columns}")
+
+
+def bench_components(parts=8, size=150):
+    m = n = parts * size
+    supply, _, costs = random_transportation(m, n)
+    demand = np.concatenate([supply[k * size:(k + 1) * size][::-1] for k in range(parts)])
+    forbidden = np.ones((m, n), dtype=bool)
+    for k in range(parts):
+        forbidden[k * size:(k + 1) * size, k * size:(k + 1) * size] = False
+    costs[forbidden] = np.inf
+
+    solver = Solver(supply.copy(), demand.copy(), costs)
+    start = time.perf_counter()
+    _, cost = solver.solve_transportation("scipy")
+    parts_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, whole_cost = Solver(supply.copy(), demand.copy(), costs).solve_transportation_scipy()
+    whole_time = time.perf_counter() - start
+    assert abs(cost - whole_cost) < 1e-6 * max(1, cost)
+    print(f"{m}x{n}, {len(solver.components())} components: by parts {parts_time:.2f} s, "
+          f"whole problem {whole_time:.2f} s, cost {cost:g}")
+
+
+def bench_multilevel(size=1500, clusters=(20, 40, 80), budgets=(0, 0.25, 1)):
+    supply, demand, costs = clustered_transportation(size, size)
+    solver = Solver(supply.copy(), demand.copy(), costs)
+    start = time.perf_counter()
+    _, optimum = solver.solve_transportation("network")
+    print(f"{size}x{size}: network {time.perf_counter() - start:.2f} s, {solver.engine.iterations} pivots, cost {optimum:g}")
+
+    print(f"{'clusters':>8}  {'pivots':>8}  {'time, s':>8}  {'gap, %':>8}")
+    for k in clusters:
+        for budget in budgets + (None,):
+            max_iterations = None if budget is None else int(budget * size)
+            solver = Solver(supply.copy(), demand.copy(), costs)
+            start = time.perf_counter()
+            _, cost = solver.solve_transportation_multilevel(k, max_iterations)
+            elapsed = time.perf_counter() - start
+            print(f"{k:>8}  {solver.engine.iterations:>8}  {elapsed:>8.2f}  {(cost - optimum) / optimum * 100:>8.2f}")
+
+
+def linear_rows(problem):
+    A_ub, b_ub, A_eq, b_eq = [], [], [], []
+    for row, sign, rhs in zip(problem["costs"], problem["signs"], problem["constraints"]):
+        if sign == "=":
+            A_eq.append(row)
+            b_eq.append(rhs)
+        else:
+            A_ub.append(row if sign == "<=" else [-x for x in row])
+            b_ub.append(rhs if sign == "<=" else -rhs)
+    return A_ub or None, b_ub or None, A_eq or None, b_eq or None
+
+
+def bench_presolve(db_name="problems.db", size=400, seed=6):
+    with ProblemDatabase(db_name) as pdb:
+        linear = list(pdb.get_all_problems("Каноническая задача линейного программирования").values())
+        transport = list(pdb.get_all_problems("Транспортная задача").values())
+    models = [Presolve(p["function"], *linear_rows(p)) for p in linear]
+    for p in transport:
+        a, b = np.asarray(p["supply"], dtype=float), np.asarray(p["demand"], dtype=float)
+        models.append(Presolve(np.asarray(p["costs"], dtype=float).reshape(-1), *transport_rows(a, b)))
+    reductions = [model.reduction * 100 for model in models]
+    print(f"{len(linear)} linear and {len(transport)} transportation problems from {db_name}: "
+          f"rows and columns removed, mean {np.mean(reductions):.1f}%, max {np.max(reductions):.1f}%")
+
+    # An imported instance: a third of the sources idle, some destinations without demand.
+    supply, demand, costs = random_transportation(size, size)
+    rng = np.random.default_rng(seed)
+    supply[rng.random(size) < 0.35] = 0
+    demand[rng.random(size) < 0.15] = 0
+    c = costs.reshape(-1)
+    rows = transport_rows(supply, demand)
+    start = time.perf_counter()
+    model = Presolve(c, *rows)
+    presolve_time = time.perf_counter() - start
+    result = model.linprog()
+    reduced_time = time.perf_counter() - start
+    start = time.perf_counter()
+    full = linprog(c, *rows)
+    full_time = time.perf_counter() - start
+    assert abs(result.fun - full.fun) < 1e-6 * max(1, full.fun)
+    print(f"{size}x{size} with idle sources: {model.reduction:.0%} removed in {presolve_time:.2f} s, "
+          f"solved in {reduced_time:.2f} s with presolve, {full_time:.2f} s without; {model.stats}")
+
+
+def bench_dispatch(sizes=((20, 20), (100, 100), (300, 300), (600, 600)), repeats=3, db_name=None):
+    """Times every exact transportation engine on repeats instances of each size and compares the pick with the fastest.
+
+    With db_name the solves record their times in the solve_timings table of
+    that database; db_name="problems.db" seeds the history of the dispatcher
+    of the application.
+    """
+    dispatcher = Dispatcher(db_name, exploration=0)
+    exact = [engine for engine in engines["transport"] if engine not in approximate_engines]
+    print(f"{'size':>10}  " + "  ".join(f"{engine:>10}" for engine in exact) + f"  {'rules':>10}  {'history':>10}")
+    for m, n in sizes:
+        times = {engine: [] for engine in exact}
+        for seed in range(repeats):
+            supply, demand, costs = random_transportation(m, n, seed)
+            for engine in exact:
+                solver = Solver(supply.copy(), demand.copy(), costs, dispatcher=dispatcher)
+                solver.solve_transportation(engine)
+                times[engine].append(solver.dispatch["seconds"])
+        rule, _ = Dispatcher(exploration=0).choose("transport", features(costs, supply, demand))
+        learned, _ = dispatcher.choose("transport", features(costs, supply, demand))
+        print(f"{m:>4}x{n:<5}  " + "  ".join(f"{np.median(times[engine]):>10.3f}" for engine in exact) + f"  {rule:>10}  {learned:>10}")
+
+
+def bench_what_if(rows=1000, cols=2000, edits=10, seed=3):
+    """Re-solves of one LP after single right-hand side and cost edits: persistent model against fresh linprog."""
+    from scipy import sparse
+    rng = np.random.default_rng(seed)
+    A = sparse.random(rows, cols, density=0.01, random_state=seed, format="csr")
+    A.data[:] = rng.integers(1, 10, A.nnz)
+    b = A @ rng.random(cols) + 1
+    c = -rng.random(cols)
+    model = LPModel(c, A, b, bounds=(0, 1), options=SolverOptions("ds"))
+    start = time.perf_counter()
+    model.solve()
+    print(f"{rows}x{cols}: first solve {time.perf_counter() - start:.2f} s, {model.iterations} iterations")
+    warm, cold, iterations = [], [], []
+    for _ in range(edits):
+        i, j = rng.integers(rows), rng.integers(cols)
+        model.set_rhs(i, model.b[i] * 0.95)
+        model.set_cost(j, model.c[j] * 1.5)
+        start = time.perf_counter()
+        result = model.solve()
+        warm.append(time.perf_counter() - start)
+        iterations.append(model.iterations)
+        start = time.perf_counter()
+        full = linprog(model.c, A_ub=model.A.tocsr(), b_ub=model.b, bounds=(0, 1), method="highs-ds")
+        cold.append(time.perf_counter() - start)
+        assert abs(result.fun - full.fun) < 1e-6 * max(1, abs(full.fun))
+    print(f"after an edit: warm {np.median(warm):.3f} s ({np.median(iterations):.0f} iterations), "
+          f"linprog {np.median(cold):.3f} s, median of {edits}")
+
+
+def bench_builder(variables=100000, rows=2000, density=0.005, dense=(1000, 5000), seed=4):
+    """Building sparse LPs of the size of the backend models with LPBuilder, and a dense one the way the table did."""
+    from scipy import sparse
+    rng = np.random.default_rng(seed)
+
+    def build(m, n):
+        nonzeros = int(m * n * density)
+        A = sparse.csr_matrix(
+            (rng.integers(1, 10, nonzeros).astype(float), (rng.integers(m, size=nonzeros), rng.integers(n, size=nonzeros))),
+            shape=(m, n),
+        )
+        signs = np.where(rng.random(m) < 0.5, ">=", "<=")
+        start = time.perf_counter()
+        builder = LPBuilder("max")
+        builder.add_variables(n, cost=rng.random(n), upper=1)
+        builder.add_constraints(A, signs, rng.random(m))
+        builder.problem()
+        return A, signs, time.perf_counter() - start
+
+    _, _, seconds = build(rows, variables)
+    print(f"{variables} variables, {rows} rows: built in {seconds:.3f} s")
+
+    A, signs, seconds = build(*dense)
+    costs = A.toarray().tolist()
+    start = time.perf_counter()
+    A_ub = [row if sign == "<=" else [-x for x in row] for row, sign in zip(costs, signs)]
+    sparse.csr_matrix(A_ub)
+    print(f"{dense[1]} variables, {dense[0]} rows: built in {seconds:.3f} s, "
+          f"as lists negated element by element {time.perf_counter() - start:.3f} s")
+
+def bench_add_rows(rows=2000, variables=4000, additions=5, density=0.005, seed=5):
+    """Constraints added one at a time to a solved LP: dual simplex from the last basis against a cold solve."""
+    from scipy import sparse
+    rng = np.random.default_rng(seed)
+    nonzeros = int(rows * variables * density)
+    A = sparse.csr_matrix(
+        (rng.integers(1, 10, nonzeros).astype(float), (rng.integers(rows, size=nonzeros), rng.integers(variables, size=nonzeros))),
+        shape=(rows, variables),
+    )
+    c = rng.random(variables)
+    builder = LPBuilder("max")
+    builder.add_variables(variables, cost=c, upper=1)
+    builder.add_constraints(A, "<=", A.sum(axis=1).A1 * 0.3)
+    model = builder.model(SolverOptions("ds"))
+    result = model.solve()
+    print(f"{rows}x{variables}: first solve {model.seconds:.2f} s, {model.iterations} iterations")
+    for _ in range(additions):
+        # A cut that the current optimum violates: at most 90% of what it ships through a random set of variables.
+        row = np.zeros(variables)
+        row[rng.choice(np.flatnonzero(result.x > 1e-9), 20)] = 1
+        builder.add_constraint(row, "<=", 0.9 * row @ result.x)
+        builder.sync(model)
+        result = model.solve("highs-ds")
+        warm = model.iterations, model.seconds
+        cold = builder.model(SolverOptions("ds"))
+        full = cold.solve()
+        assert abs(result.fun - full.fun) < 1e-6 * max(1, abs(full.fun))
+        print(f"row {builder.row_count}: warm {warm[0]} iterations in {warm[1]:.3f} s, "
+              f"cold {cold.iterations} iterations in {cold.seconds:.3f} s")
+
+
+benchmarks = {
+    "assembly": bench_assembly,
+    "engines": bench_engines,
+    "initial": bench_initial_solutions,
+    "warm": bench_warm_start,
+    "batch": bench_batch,
+    "capacities": bench_capacities,
+    "bounds": bench_route_bounds,
+    "columns": bench_columns,
+    "parametric": bench_parametric,
+    "sinkhorn": bench_sinkhorn,
+    "components": bench_components,
+    "multilevel": bench_multilevel,
+    "presolve": bench_presolve,
+    "dispatch": bench_dispatch,
+    "what-if": bench_what_if,
+    "builder": bench_builder,
+    "add-rows": bench_add_rows,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or benchmarks:
+        print(f"== {name} ==")
+        benchmarks[name]()
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+from scipy import sparse
+from ProblemDatabase import ProblemDatabase
+
+engines = {
+    "transport": ("network", "highs-ds", "highs-ipm", "columns", "multilevel", "sinkhorn"),
+    "linear": ("highs-ds", "highs-ipm"),
+    "assignment": ("hungarian", "network"),
+}
+
+approximate_engines = {"sinkhorn"}
+
+engine_names = {
+    "network": "Транспортный симплекс",
+    "highs-ds": "Двойственный симплекс HiGHS",
+    "highs-ipm": "Метод внутренней точки HiGHS",
+    "columns": "Генерация столбцов",
+    "multilevel": "Многоуровневый метод",
+    "sinkhorn": "Алгоритм Синкхорна (приближённо)",
+    "hungarian": "Венгерский алгоритм",
+}
+
+
+def features(costs, supply=None, demand=None, A=None, bounded=False):
+    """What the choice of engine depends on: size, nonzeros, balance and integrality of the data."""
+    costs = np.asarray(costs, dtype=float)
+    quantities = [np.asarray(x, dtype=float) for x in (supply, demand) if x is not None]
+    finite = np.isfinite(costs)
+    result = {
+        "size": int(costs.size if A is None else np.prod(np.shape(A))),
+        "nonzeros": int(np.count_nonzero(finite) if A is None else A.count_nonzero() if sparse.issparse(A) else np.count_nonzero(A)),
+        "integral": all(np.array_equal(x, np.round(x)) for x in quantities),
+        "balanced": len(quantities) < 2 or bool(np.isclose(quantities[0].sum(), quantities[1].sum())),
+        "bounded": bool(bounded or not finite.all()),
+    }
+    result["density"] = result["nonzeros"] / max(result["size"], 1)
+    return result
+
+
+class Dispatcher(object):
+    """Picks the engine of a solve from the features of the problem and the timings of past solves.
+
+    Timings are kept per problem kind and size class (powers of two of the
+    variable count). Once at least two engines have min_history solves in
+    the class of a problem, the one with the lowest median time is taken;
+    before that fixed rules decide. So that the other engines get timings
+    too, with probability exploration (0 unless set) a problem of at most explore_limit
+    variables goes to the engine with the fewest timings in its class while
+    some engine still has fewer than min_history. With db_name the timings
+    are also stored in the solve_timings table, so they survive restarts.
+history and record may be called from several threads.
+    choose returns the engine and the reason, both meant to be shown.
+    """
+
+    def __init__(self, db_name=None, min_history=3, exploration=0, explore_limit=250000, seed=None):
+        self.db_name = db_name
+        self.min_history = min_history
+        self.exploration = exploration
+        self.explore_limit = explore_limit
+        self.rng = np.random.default_rng(seed)
+        self.timings = defaultdict(list)
+        self._pdb = None
+        self._loaded = False
+        self.lock = threading.Lock()
+
+    @property
+    def pdb(self):
+        if self._pdb is None and self.db_name is not None:
+            self._pdb = ProblemDatabase(self.db_name, check_same_thread=False)
+        return self._pdb
+
+    @staticmethod
+    def size_class(features):
+        return int(np.log2(max(features["size"], 1)))
+
+    def history(self, kind, features, min_history=None):
+        """Median time and number of recorded solves of every engine for problems of this kind and size."""
+        size_class = self.size_class(features)
+        with self.lock:
+            if not self._loaded and self.pdb is not None:
+                for row in self.pdb.read_timings():
+                    self.timings[row[:3]].append(row[3])
+                self._loaded = True
+            return {
+                engine: (float(np.median(times)), len(times))
+                for (k, engine, c), times in self.timings.items()
+                if k == kind and c == size_class and len(times) >= (self.min_history if min_history is None else min_history)
+            }
+
+    def choose(self, kind, features, exact=True):
+        candidates = [e for e in engines[kind] if not (exact and e in approximate_engines)]
+        if features["bounded"] and kind == "transport":
+            # Column generation, the multilevel and the approximate engines do not model route bounds.
+            candidates = [e for e in candidates if e in ("network", "highs-ds", "highs-ipm")]
+
+        recorded = self.history(kind, features, 1)
+        counts = {e: recorded.get(e, (0, 0))[1] for e in candidates}
+        untried = [e for e in candidates if counts[e] < self.min_history]
+        if untried and features["size"] <= self.explore_limit and self.rng.random() < self.exploration:
+            fewest = min(counts[e] for e in untried)
+            engine = str(self.rng.choice([e for e in untried if counts[e] == fewest]))
+            return engine, f"пробный запуск: по этому методу пока {counts[engine]} замеров на задачах такого размера"
+
+        history = {e: h for e, h in self.history(kind, features).items() if e in candidates}
+        if len(history) >= 2:
+            engine = min(history, key=lambda e: history[e][0])
+            median, count = history[engine]
+            return engine, f"быстрее всех на задачах такого размера: медиана {median:.3g} с по {count} решениям"
+        return self._rule(kind, features, exact)
+
+    def _rule(self, kind, features, exact):
+        size = features["size"]
+        if kind == "assignment":
+            return "hungarian", "задача о назначениях"
+        if kind == "linear":
+            if features["nonzeros"] > 100000 and features["density"] < 0.1:
+                return "highs-ipm", "большая разреженная задача"
+            return "highs-ds", "задача небольшая или плотная"
+        if features["bounded"]:
+            if features["balanced"]:
+                return "network", "ограничения на маршруты при равных запасах и потребностях: задача вырождена, симплекс HiGHS на ней буксует"
+            if size <= 250000:
+                return "network", "ограничения на маршруты, транспортный симплекс их учитывает"
+            return "highs-ds", "большая несбалансированная задача с ограничениями на маршруты"
+        if size <= 2500:
+            return "network", "небольшая задача"
+        # An approximate plan of integral data would not be integral.
+        if not exact and size > 1000000 and not features["integral"]:
+            return "sinkhorn", "очень большая задача, допускается приближённое решение"
+        return "columns", "в оптимальный план входит мало маршрутов, остальные только проверяются"
+
+    def record(self, kind, features, engine, seconds):
+        key = kind, engine, self.size_class(features)
+        with self.lock:
+            self.timings[key].append(seconds)
+            if self.pdb is not None:
+                self.pdb.save_timing(*key, seconds)
+
+    def run(self, kind, features, solve, exact=True, choice=None):
+        """solve(engine) with the chosen engine, or with choice, an (engine, reason) set elsewhere,
+        timed and recorded; returns its result and what ran and why."""
+        engine, reason = choice or self.choose(kind, features, exact)
+        start = time.perf_counter()
+        result = solve(engine)
+        seconds = time.perf_counter() - start
+        if engine in engines[kind]:
+            self.record(kind, features, engine, seconds)
+        return result, {"engine": engine, "reason": reason, "seconds": seconds}
+
+
+dispatcher = Dispatcher(db_name="problems.db", exploration=0.1)
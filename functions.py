@@ -3,6 +3,7 @@ import os
 from PySide6.QtWidgets import QPushButton, QWidget, QVBoxLayout, QLabel, QLineEdit
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QColor, QBrush
+from solver_options import SolverOptions
 
 def get_settings():
     with open("settings.txt") as f:
@@ -14,6 +15,8 @@ def get_settings():
         for line in lines:
             if ':' in line:
                 key, value = line.split(':', 1)
+                if key.strip().startswith("solver_"):
+                    continue
                 result[key.strip()] = int(value.strip())
         return result
     except:
@@ -24,6 +27,31 @@ def get_settings():
             "height": 768
         }
     
+# HiGHS settings from the solver_* lines of settings.txt, for example
+# solver_method: ipm, solver_threads: 8, solver_presolve: 0, solver_time_limit: 60
+def get_solver_options():
+    options = {}
+    try:
+        with open("settings.txt") as f:
+            lines = f.read().strip().split('\n')
+        for line in lines:
+            key, _, value = line.partition(':')
+            key, value = key.strip(), value.strip()
+            if not key.startswith("solver_"):
+                continue
+            key = key[len("solver_"):]
+            if key == "method":
+                options[key] = value
+            elif key in ("threads", "presolve"):
+                options[key] = int(value)
+            else:
+                options[key] = float(value)
+        if "presolve" in options:
+            options["presolve"] = bool(options["presolve"])
+        return SolverOptions(**options)
+    except (OSError, TypeError, ValueError):
+        return SolverOptions()
+
 def combine_arrays_pure(arr1, arr2):
     rows1, cols1 = len(arr1), len(arr1[0]) if arr1 else 0
     rows2, cols2 = len(arr2), len(arr2[0]) if arr2 else 0
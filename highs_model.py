@@ -0,0 +1,224 @@
+import time
+import numpy as np
+from scipy import sparse
+from scipy.optimize import OptimizeResult
+from solver_options import SolverOptions
+from presolve import column_bounds
+
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+# The thread pool of highspy, like that of the HiGHS in scipy, is started once per process.
+_threads_started = None
+
+_statuses = {
+    "kOptimal": 0,
+    "kTimeLimit": 1,
+    "kIterationLimit": 1,
+    "kInfeasible": 2,
+    "kUnbounded": 3,
+    "kUnboundedOrInfeasible": 3,
+}
+
+
+class LPModel(object):
+    """A linear program min c.x, A_ub x <= b_ub, A_eq x = b_eq kept alive between solves.
+
+    Costs, right-hand sides and single coefficients can be changed and rows
+    and columns added without building the problem again. With highspy the
+    model lives in one Highs object, which keeps the last basis, so a solve
+    after a small change is a few simplex pivots from the previous optimum.
+    Without highspy every solve is a fresh linprog call on the current data.
+    solve returns an OptimizeResult shaped like that of linprog.
+    """
+
+    def __init__(self, c, A_ub=None, b_ub=None, A_eq=None, b_eq=None, bounds=(0, None), options=None):
+        self.options = options or SolverOptions()
+        self.c = np.array(c, dtype=float).reshape(-1)
+        n = self.c.size
+        blocks = [(A, b, equality) for A, b, equality in ((A_ub, b_ub, False), (A_eq, b_eq, True)) if A is not None and np.shape(A)[0]]
+        self.A = sparse.vstack(
+            [sparse.csr_matrix(A, shape=(np.shape(A)[0], n)) for A, _, _ in blocks] + [sparse.csr_matrix((0, n))], format="lil"
+        )
+        self.b = np.concatenate([np.asarray(b, dtype=float).reshape(-1) for _, b, _ in blocks] + [np.zeros(0)])
+        self.equality = np.concatenate([np.full(np.shape(A)[0], equality) for A, _, equality in blocks] + [np.zeros(0, dtype=bool)])
+        self.lower, self.upper = column_bounds(bounds, n)
+        self.iterations = 0
+        self.seconds = 0
+        self.added = 0
+        self.warm = False
+        self.cold = None
+        self.highs = None
+        if highspy is not None:
+            self._build()
+
+    def _build(self):
+        self.highs = highspy.Highs()
+        self.highs.setOptionValue("output_flag", False)
+        n = self.c.size
+        self.highs.addVars(n, self.lower, self.upper)
+        self.highs.changeColsCost(n, np.arange(n, dtype=np.int32), self.c)
+        A = self.A.tocsr()
+        row_lower, row_upper = self._row_bounds(self.b, self.equality)
+        self.highs.addRows(A.shape[0], row_lower, row_upper, A.nnz,
+                           A.indptr[:-1].astype(np.int32), A.indices.astype(np.int32), A.data)
+
+    @staticmethod
+    def _row_bounds(b, equality):
+        return np.where(equality, b, -highspy.kHighsInf), b
+
+    @property
+    def shape(self):
+        return self.A.shape
+
+    @property
+    def has_basis(self):
+        return self.highs is not None and self.highs.getBasis().valid
+
+    def set_cost(self, j, cost):
+        self.c[j] = cost
+        if self.highs is not None:
+            self.highs.changeColCost(int(j), float(cost))
+
+    def set_rhs(self, i, value):
+        """Right-hand side of row i; rows are numbered in the order they were given or added."""
+        self.b[i] = value
+        if self.highs is not None:
+            lower, upper = self._row_bounds(self.b[i:i + 1], self.equality[i:i + 1])
+            self.highs.changeRowBounds(int(i), float(lower[0]), float(upper[0]))
+
+    def set_coefficient(self, i, j, value):
+        self.A[i, j] = value
+        if self.highs is not None:
+            self.highs.changeCoeff(int(i), int(j), float(value))
+
+    def add_rows(self, A, b, equality=False):
+        """Rows appended after the existing ones; the basis is kept with the new rows basic."""
+        A = sparse.csr_matrix(A, shape=(np.shape(A)[0], self.c.size))
+        b = np.asarray(b, dtype=float).reshape(-1)
+        equality = np.broadcast_to(np.asarray(equality, dtype=bool), b.shape)
+        self.A = sparse.vstack([self.A, A], format="lil")
+        self.b = np.concatenate([self.b, b])
+        self.equality = np.concatenate([self.equality, equality])
+        if self.highs is not None:
+            lower, upper = self._row_bounds(b, equality)
+            self.highs.addRows(A.shape[0], lower, upper, A.nnz, A.indptr[:-1].astype(np.int32), A.indices.astype(np.int32), A.data)
+
+    def add_row(self, coefficients, rhs, equality=False):
+        self.add_rows(np.asarray(coefficients, dtype=float).reshape(1, -1), [rhs], equality)
+
+    def add_column(self, cost, coefficients, bounds=(0, None)):
+        """New variable with the given coefficients in every existing row."""
+        coefficients = np.asarray(coefficients, dtype=float).reshape(-1, 1)
+        lower, upper = column_bounds(bounds, 1)
+        self.A = sparse.hstack([self.A, sparse.lil_matrix(coefficients)], format="lil")
+        self.c = np.append(self.c, cost)
+        self.lower, self.upper = np.append(self.lower, lower), np.append(self.upper, upper)
+        if self.highs is not None:
+            rows = np.flatnonzero(coefficients[:, 0]).astype(np.int32)
+            self.highs.addCol(float(cost), float(lower[0]), float(upper[0]), rows.size, rows, coefficients[rows, 0])
+
+    def update(self, c, A_ub=None, b_ub=None, A_eq=None, b_eq=None):
+        """Bring the model to new data given as linprog blocks; see sync."""
+        n = np.size(c)
+        blocks = [(A, b, equality) for A, b, equality in ((A_ub, b_ub, False), (A_eq, b_eq, True)) if A is not None and np.shape(A)[0]]
+        return self.sync(
+            c,
+            sparse.vstack([sparse.csr_matrix(A, shape=(np.shape(A)[0], n)) for A, _, _ in blocks] + [sparse.csr_matrix((0, n))], format="csr"),
+            np.concatenate([np.asarray(b, dtype=float).reshape(-1) for _, b, _ in blocks] + [np.zeros(0)]),
+            np.concatenate([np.full(np.shape(A)[0], equality) for A, _, equality in blocks] + [np.zeros(0, dtype=bool)]),
+        )
+
+    def sync(self, c, A, b, equality):
+        """Bring the model to new data by changing only what differs and appending new rows at the end.
+
+        The rows of the model must be the first rows of A with the same
+        equality flags, and the number of columns must not change; otherwise
+        nothing is changed and False is returned. self.added is the number of
+        rows appended.
+        """
+        c = np.asarray(c, dtype=float).reshape(-1)
+        A = sparse.csr_matrix(A)
+        b = np.asarray(b, dtype=float).reshape(-1)
+        equality = np.asarray(equality, dtype=bool).reshape(-1)
+        k = self.shape[0]
+        if c.size != self.c.size or A.shape[0] < k or (equality[:k] != self.equality).any():
+            return False
+
+        for j in np.flatnonzero(c != self.c):
+            self.set_cost(j, c[j])
+        for i in np.flatnonzero(b[:k] != self.b):
+            self.set_rhs(i, b[i])
+        rows, cols = (A[:k] - self.A.tocsr()).nonzero()
+        for i, j in zip(rows, cols):
+            self.set_coefficient(i, j, A[i, j])
+        self.added = A.shape[0] - k
+        if self.added:
+            self.add_rows(A[k:], b[k:], equality[k:])
+        return True
+
+    def solve(self, method=None):
+        """Solve from the last basis; method is a linprog method name overriding the one of the options.
+
+        self.iterations and self.seconds describe this solve, self.warm tells
+        whether it started from a basis, self.cold gives the
+        iterations and seconds of the last solve that started without a basis.
+        """
+        if self.highs is None:
+            return self._linprog(method)
+        self._apply_options(method)
+        self.warm = self.has_basis
+        start = time.perf_counter()
+        self.highs.run()
+        self.seconds = time.perf_counter() - start
+        status = _statuses.get(self.highs.getModelStatus().name, 4)
+        info = self.highs.getInfo()
+        self.iterations = info.simplex_iteration_count + info.ipm_iteration_count
+        if not self.warm:
+            self.cold = self.iterations, self.seconds
+        if status != 0:
+            return OptimizeResult(x=None, fun=None, status=status, success=False, nit=self.iterations,
+                                  message=self.highs.modelStatusToString(self.highs.getModelStatus()))
+        solution = self.highs.getSolution()
+        row_dual = np.asarray(solution.row_dual)
+        return OptimizeResult(
+            x=np.asarray(solution.col_value), fun=info.objective_function_value, status=0, success=True,
+            message="Optimal", nit=self.iterations,
+            lower=OptimizeResult(marginals=np.asarray(solution.col_dual)),
+            ineqlin=OptimizeResult(marginals=row_dual[~self.equality]),
+            eqlin=OptimizeResult(marginals=row_dual[self.equality]),
+        )
+
+    def _apply_options(self, method):
+        global _threads_started
+        # Back to the defaults first: options left unset must not keep the value of an earlier solve.
+        self.highs.resetOptions()
+        self.highs.setOptionValue("output_flag", False)
+        options = self.options.highs_options(method)
+        threads = options.pop("threads", None)
+        if threads is not None and _threads_started in (None, threads):
+            self.highs.setOptionValue("threads", threads)
+        elif _threads_started:
+            self.highs.setOptionValue("threads", _threads_started)
+        if _threads_started is None:
+            _threads_started = threads or 0
+        for name, value in options.items():
+            self.highs.setOptionValue(name, value)
+
+    def _linprog(self, method):
+        start = time.perf_counter()
+        A = self.A.tocsr()
+        ub, eq = ~self.equality, self.equality
+        result = self.options.linprog(
+            self.c, method=method,
+            A_ub=A[ub] if ub.any() else None, b_ub=self.b[ub] if ub.any() else None,
+            A_eq=A[eq] if eq.any() else None, b_eq=self.b[eq] if eq.any() else None,
+            bounds=np.column_stack([self.lower, self.upper]),
+        )
+        self.iterations = result.nit
+        self.warm = False
+        self.seconds = time.perf_counter() - start
+        self.cold = self.iterations, self.seconds
+        return result
@@ -0,0 +1,173 @@
+import numpy as np
+from scipy import sparse
+from highs_model import LPModel
+
+senses = ("<=", ">=", "=")
+
+
+class LPBuilder(object):
+    """A linear program put together in code, without the input table.
+
+    Variables have names, costs and bounds and are added one at a time or
+    many at once. Rows have a sense "<=", ">=" or "=" and a right-hand side;
+    their coefficients are kept as sparse triplets and become one CSR
+    matrix only when the problem is asked for. problem() gives the arguments
+    of linprog, with ">=" rows negated into A_ub and the costs negated for
+    "max". row_marginals and reduced_costs turn the marginals of that form
+    back into changes of the user's objective, one per row and per variable.
+    """
+
+    def __init__(self, sense="min"):
+        if sense not in ("min", "max"):
+            raise ValueError(f"Неизвестное направление оптимизации: {sense}")
+        self.sense = sense
+        self.names = []
+        self.index = {}
+        self._costs, self._lower, self._upper = [], [], []
+        self._rows, self._cols, self._data = [], [], []
+        self._senses, self._rhs = [], []
+        self.row_names = []
+        self.variable_count = 0
+        self.row_count = 0
+        self._matrix = None
+
+    def add_variables(self, names, cost=0, lower=0, upper=None):
+        """names is a list of names or a count, then they are x1, x2, ...; None bounds are infinite. Returns the indices."""
+        if isinstance(names, (int, np.integer)):
+            names = [f"x{j}" for j in range(self.variable_count + 1, self.variable_count + names + 1)]
+        names = list(names)
+        k = len(names)
+        for name in names:
+            if name in self.index:
+                raise ValueError(f"Переменная {name} уже есть в задаче")
+            self.index[name] = len(self.names)
+            self.names.append(name)
+        self._costs.append(np.broadcast_to(np.asarray(cost, dtype=float), (k,)))
+        self._lower.append(np.broadcast_to(np.asarray(-np.inf if lower is None else lower, dtype=float), (k,)))
+        self._upper.append(np.broadcast_to(np.asarray(np.inf if upper is None else upper, dtype=float), (k,)))
+        self.variable_count += k
+        self._matrix = None
+        return np.arange(self.variable_count - k, self.variable_count)
+
+    def add_variable(self, name=None, cost=0, lower=0, upper=None):
+        return int(self.add_variables(1 if name is None else [name], cost, lower, upper)[0])
+
+    def variables(self, names):
+        """Indices of the variables with these names."""
+        return np.array([self.index[name] for name in names], dtype=int)
+
+    def add_constraints(self, A, sense, rhs, names=None):
+        """Rows of A (dense or sparse, one column per variable so far) with one sense for all or one per row."""
+        A = sparse.coo_matrix(A)
+        k = A.shape[0]
+        if A.shape[1] > self.variable_count:
+            raise ValueError("В ограничении больше коэффициентов, чем переменных в задаче")
+        sense = np.broadcast_to(np.asarray(sense, dtype=object), (k,))
+        if not np.isin(sense, senses).all():
+            raise ValueError(f"Неизвестный знак ограничения: {next(s for s in sense if s not in senses)}")
+        self._rows.append(A.row + self.row_count)
+        self._cols.append(A.col)
+        self._data.append(A.data.astype(float))
+        self._senses.append(sense)
+        self._rhs.append(np.broadcast_to(np.asarray(rhs, dtype=float), (k,)))
+        self.row_names.extend(names if names is not None else [f"Ограничение {i}" for i in range(self.row_count + 1, self.row_count + k + 1)])
+        self.row_count += k
+        self._matrix = None
+        return np.arange(self.row_count - k, self.row_count)
+
+    def add_constraint(self, coefficients, sense, rhs, name=None):
+        """coefficients is a dense row or a dict of variable name or index to coefficient. Returns the row index."""
+        if isinstance(coefficients, dict):
+            cols = [self.index[j] if isinstance(j, str) else j for j in coefficients]
+            coefficients = sparse.coo_matrix((list(coefficients.values()), ([0] * len(cols), cols)), shape=(1, self.variable_count))
+        else:
+            coefficients = np.asarray(coefficients, dtype=float).reshape(1, -1)
+        return int(self.add_constraints(coefficients, sense, rhs, None if name is None else [name])[0])
+
+    @property
+    def cost(self):
+        return np.concatenate(self._costs + [np.zeros(0)])
+
+    @property
+    def lower(self):
+        return np.concatenate(self._lower + [np.zeros(0)])
+
+    @property
+    def upper(self):
+        return np.concatenate(self._upper + [np.zeros(0)])
+
+    @property
+    def senses(self):
+        return np.concatenate(self._senses + [np.zeros(0, dtype=object)])
+
+    @property
+    def rhs(self):
+        return np.concatenate(self._rhs + [np.zeros(0)])
+
+    def matrix(self):
+        """All rows as they were given, in CSR form."""
+        if self._matrix is None:
+            self._matrix = sparse.csr_matrix(
+                (np.concatenate(self._data + [np.zeros(0)]),
+                 (np.concatenate(self._rows + [np.zeros(0, dtype=int)]), np.concatenate(self._cols + [np.zeros(0, dtype=int)]))),
+                shape=(self.row_count, self.variable_count),
+            )
+        return self._matrix
+
+    @property
+    def minimized_cost(self):
+        return -self.cost if self.sense == "max" else self.cost
+
+    def rows(self):
+        """All rows in the order given, ">=" rows negated: the matrix, right-hand sides and equality flags."""
+        senses = self.senses
+        flip = np.where(senses == ">=", -1.0, 1.0)
+        return (sparse.diags(flip) @ self.matrix()).tocsr(), flip * self.rhs, senses == "="
+
+    def problem(self):
+        """Keyword arguments of linprog: c, A_ub, b_ub, A_eq, b_eq and bounds; empty blocks are None."""
+        A, b, equality = self.rows()
+        ub, eq = ~equality, equality
+        return {
+            "c": self.minimized_cost,
+            "A_ub": A[ub] if ub.any() else None,
+            "b_ub": b[ub] if ub.any() else None,
+            "A_eq": A[eq] if eq.any() else None,
+            "b_eq": b[eq] if eq.any() else None,
+            "bounds": np.column_stack([self.lower, self.upper]),
+        }
+
+    def row_marginals(self, ineqlin, eqlin):
+        """Change of the objective per unit of the right-hand side of every row, from the marginals of problem()."""
+        senses = self.senses
+        result = np.zeros(self.row_count)
+        result[senses != "="] = np.where(senses[senses != "="] == ">=", -1.0, 1.0) * np.asarray(ineqlin, dtype=float)
+        result[senses == "="] = eqlin
+        return -result if self.sense == "max" else result
+
+    def reduced_costs(self, marginals):
+        marginals = np.asarray(marginals, dtype=float)
+        return -marginals if self.sense == "max" else marginals
+
+    def model(self, options=None):
+        """LPModel with the rows in the order given, so rows added here later can be appended to it with sync."""
+        model = LPModel(self.minimized_cost, bounds=np.column_stack([self.lower, self.upper]), options=options)
+        model.add_rows(*self.rows())
+        return model
+
+    def sync(self, model):
+        """Bring a model made by model() to the current problem; False if it cannot be done in place."""
+        if model.c.size != self.variable_count or not (np.array_equal(model.lower, self.lower) and np.array_equal(model.upper, self.upper)):
+            return False
+        return model.sync(self.minimized_cost, *self.rows())
+
+    def solve(self, options=None, method=None):
+        """Solve once; fun is in the user's sense, duals and reduced_costs are per row and per variable."""
+        result = self.model(options).solve(method)
+        if result.status == 0:
+            if self.sense == "max":
+                result.fun = -result.fun
+            result.duals = self.row_marginals(result.ineqlin.marginals, result.eqlin.marginals)
+            result.reduced_costs = self.reduced_costs(result.lower.marginals)
+            result.variables = dict(zip(self.names, result.x))
+        return result
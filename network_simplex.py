@@ -0,0 +1,622 @@
+from collections import deque
+import numpy as np
+
+
+class TransportationSimplex(object):
+    """Transportation simplex (MODI method) for an m x n problem.
+
+    The problem is closed with one slack node: a destination that takes the
+    surplus supply, or a source that covers the missing demand when demand
+    exceeds supply (also present, with zero quantity, in balanced problems).
+    The basis is a spanning tree over the sources and the destinations of the
+    closed problem, rooted at source 0. After a pivot only the subtree cut off
+    by the leaving route gets new potentials, and the entering route is priced
+    in row blocks with numpy. Pivots only add and subtract flow amounts, so
+    integral supply and demand give an integral plan.
+    """
+
+    def __init__(self, costs, supply, demand, plan=None, upper=None, eps=1e-9, block_size=65536):
+        costs = np.asarray(costs, dtype=float)
+        self.shape = costs.shape
+        self.slack = self.slack_side(supply, demand)
+        self.costs, self.supply, self.demand = self._close(costs, supply, demand)
+        self.upper = None
+        if plan is not None:
+            plan = self._close_plan(plan)
+        if upper is not None:
+            start = self._add_artificial(upper)
+            if plan is not None:
+                # A given plan leaves the artificial routes empty but the one between the artificial nodes.
+                start[:-1, :-1] = plan
+                start[:-1, -1] = 0
+                start[-1, :-1] = 0
+                start[-1, -1] = self.supply[-1]
+            plan = start
+        elif plan is None:
+            plan = self._close_plan(north_west_corner(supply, demand))
+
+        self.m, self.n = self.costs.shape
+        self.eps = eps
+        self.block_rows = max(1, min(self.m, block_size // max(self.n, 1)))
+        self.block_start = 0
+        self.iterations = 0
+        self.set_plan(plan)
+
+    @staticmethod
+    def slack_side(supply, demand):
+        return "row" if np.sum(supply) < np.sum(demand) else "column"
+
+    def _close(self, costs, supply, demand):
+        supply = np.asarray(supply, dtype=float)
+        demand = np.asarray(demand, dtype=float)
+        m, n = costs.shape
+        surplus = supply.sum() - demand.sum()
+        if self.slack == "column":
+            closed = np.zeros((m, n + 1))
+            demand = np.append(demand, surplus)
+        else:
+            closed = np.zeros((m + 1, n))
+            supply = np.append(supply, -surplus)
+        closed[:m, :n] = costs
+        return closed, supply, demand
+
+    def _add_artificial(self, upper):
+        """Capacitated start: an artificial source and destination carry everything at a prohibitive cost.
+
+        Every real route starts empty at its lower bound; any flow left on an
+        artificial route at the optimum means the capacities cannot be met.
+        """
+        m, n = self.costs.shape
+        penalty = 1 + 2 * (m + n) * max(np.abs(self.costs).max(initial=0), 1)
+        costs = np.full((m + 1, n + 1), penalty, dtype=float)
+        costs[:m, :n] = self.costs
+        costs[m, n] = 0
+        self.costs = costs
+        self.upper = np.full((m + 1, n + 1), np.inf)
+        self.upper[:self.shape[0], :self.shape[1]] = upper
+
+        plan = np.zeros((m + 1, n + 1))
+        plan[:m, n] = self.supply
+        plan[m, :n] = self.demand
+        self.supply = np.append(self.supply, self.demand.sum())
+        self.demand = np.append(self.demand, self.supply[:m].sum())
+        return plan
+
+    def _close_plan(self, plan):
+        plan = np.asarray(plan, dtype=float)
+        m, n = self.shape
+        closed = np.zeros(self.costs.shape)
+        closed[:m, :n] = plan
+        if self.slack == "column":
+            closed[:, n] = self.supply - plan.sum(axis=1)
+        else:
+            closed[m, :] = self.demand - plan.sum(axis=0)
+        return closed
+
+    def fits(self, costs, supply, demand, upper=None):
+        """Whether the current basis can be reused for this problem.
+
+        A capacitated basis is only reused for cost changes.
+        """
+        if np.shape(costs) != self.shape or self.slack_side(supply, demand) != self.slack:
+            return False
+        if upper is None or self.upper is None:
+            return upper is None and self.upper is None
+        m, n = self.shape
+        _, supply, demand = self._close(np.zeros(self.shape), supply, demand)
+        return (np.array_equal(upper, self.upper[:m, :n]) and np.array_equal(supply, self.supply[:-1])
+                and np.array_equal(demand, self.demand[:-1]))
+
+    @property
+    def plan(self):
+        m, n = self.shape
+        return self.x[:m, :n]
+
+    @property
+    def cost(self):
+        return float(np.sum(self.x * self.costs))
+
+    def set_plan(self, plan):
+        """Take any feasible plan and turn it into a basic one without raising its cost.
+
+        Routes at their capacity stay out of the basis, at the upper bound.
+        """
+        m, n = self.m, self.n
+        self.x = np.array(plan, dtype=float)
+        self.basis = np.zeros((m, n), dtype=bool)
+        self.at_upper = np.zeros((m, n), dtype=bool)
+        if self.upper is not None:
+            self.at_upper = (self.x > self.eps) & (self.x >= self.upper - self.eps)
+        self.adjacency = [set() for _ in range(m + n)]
+        parent = list(range(m + n))
+
+        def find(a):
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            return a
+
+        rows, cols = np.nonzero((self.x > self.eps) & ~self.at_upper)
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            if self.x[i, j] <= self.eps or self.at_upper[i, j]:
+                continue
+            a, b = find(i), find(m + j)
+            if a != b:
+                parent[a] = b
+                self._add_edge(i, j)
+            else:
+                self._cancel_cycle(i, j)
+
+        # Components left after the positive routes are joined with zero-flow routes.
+        for i in range(m):
+            a, b = find(i), find(m)
+            if a != b:
+                parent[a] = b
+                self._add_edge(i, 0)
+        for j in range(1, n):
+            a, b = find(0), find(m + j)
+            if a != b:
+                parent[b] = a
+                self._add_edge(0, j)
+
+        self._build_tree()
+
+    def _add_edge(self, i, j):
+        self.basis[i, j] = True
+        self.at_upper[i, j] = False
+        self.adjacency[i].add(self.m + j)
+        self.adjacency[self.m + j].add(i)
+
+    def _remove_edge(self, i, j):
+        self.basis[i, j] = False
+        self.adjacency[i].discard(self.m + j)
+        self.adjacency[self.m + j].discard(i)
+
+    def _forest_cycle(self, i, j):
+        previous = {self.m + j: None}
+        queue = deque([self.m + j])
+        while i not in previous:
+            node = queue.popleft()
+            for neighbour in self.adjacency[node]:
+                if neighbour not in previous:
+                    previous[neighbour] = node
+                    queue.append(neighbour)
+        rows = [i]
+        cols = [j]
+        node = i
+        while previous[node] is not None:
+            a, b = node, previous[node]
+            rows.append(min(a, b))
+            cols.append(max(a, b) - self.m)
+            node = b
+        # The walk above runs from i back to j, the cycle order needs j first.
+        return np.array(rows[:1] + rows[:0:-1]), np.array(cols[:1] + cols[:0:-1])
+
+    def _cancel_cycle(self, i, j):
+        """Route (i, j) closes a cycle: shift flow around it in the non-increasing direction."""
+        rows, cols = self._forest_cycle(i, j)
+        direction = np.sum(self.costs[rows[0::2], cols[0::2]]) - np.sum(self.costs[rows[1::2], cols[1::2]])
+        if direction > 0:
+            rows, cols = np.roll(rows, -1), np.roll(cols, -1)
+        room = self.x[rows, cols].copy()
+        room[0::2] = np.inf if self.upper is None else self.upper[rows[0::2], cols[0::2]] - room[0::2]
+        k = int(np.argmin(room))
+        theta = room[k]
+        self.x[rows[0::2], cols[0::2]] += theta
+        self.x[rows[1::2], cols[1::2]] -= theta
+        leaving = (int(rows[k]), int(cols[k]))
+        # A route that lost its flow leaves at zero, one that filled up at its capacity.
+        if k % 2:
+            self.x[leaving] = 0
+        else:
+            self.x[leaving] = self.upper[leaving]
+            self.at_upper[leaving] = True
+        if leaving != (i, j):
+            self._remove_edge(*leaving)
+            self._add_edge(i, j)
+
+    def _build_tree(self):
+        """Root the basis tree at source 0 and compute parents, depths and potentials."""
+        m = self.m
+        self.parent = [-1] * (m + self.n)
+        self.depth = [0] * (m + self.n)
+        self.u = np.zeros(m)
+        self.v = np.zeros(self.n)
+        self._hang(0, -1)
+
+    def _hang(self, top, parent):
+        """Set parents, depths and potentials of the subtree hanging from top."""
+        m = self.m
+        costs = self.costs
+        self.parent[top] = parent
+        queue = deque([top])
+        while queue:
+            node = queue.popleft()
+            up = self.parent[node]
+            if up >= 0:
+                self.depth[node] = self.depth[up] + 1
+                if node < m:
+                    self.u[node] = costs[node, up - m] - self.v[up - m]
+                else:
+                    self.v[node - m] = costs[up, node - m] - self.u[up]
+            for neighbour in self.adjacency[node]:
+                if neighbour != up:
+                    self.parent[neighbour] = node
+                    queue.append(neighbour)
+
+    def path(self, start, end):
+        """Tree nodes from start to end."""
+        head = [start]
+        tail = [end]
+        depth, parent = self.depth, self.parent
+        while head[-1] != tail[-1]:
+            if depth[head[-1]] >= depth[tail[-1]]:
+                head.append(parent[head[-1]])
+            else:
+                tail.append(parent[tail[-1]])
+        return head + tail[-2::-1]
+
+    def cycle(self, i, j):
+        """Cells of the cycle closed by route (i, j); even positions gain flow, odd positions lose it."""
+        nodes = self.path(self.m + j, i)
+        rows = [i]
+        cols = [j]
+        for a, b in zip(nodes, nodes[1:]):
+            if a < self.m:
+                rows.append(a)
+                cols.append(b - self.m)
+            else:
+                rows.append(b)
+                cols.append(a - self.m)
+        return np.array(rows), np.array(cols)
+
+    def potentials(self, costs=None):
+        """Potentials with u_i + v_j = c_ij on every basic route and u_0 = 0."""
+        if costs is None:
+            return self.u, self.v
+        m = self.m
+        u = np.zeros(m)
+        v = np.zeros(self.n)
+        seen = np.zeros(m + self.n, dtype=bool)
+        seen[0] = True
+        queue = deque([0])
+        while queue:
+            node = queue.popleft()
+            for neighbour in self.adjacency[node]:
+                if seen[neighbour]:
+                    continue
+                seen[neighbour] = True
+                if node < m:
+                    v[neighbour - m] = costs[node, neighbour - m] - u[node]
+                else:
+                    u[neighbour] = costs[neighbour, node - m] - v[node - m]
+                queue.append(neighbour)
+        return u, v
+
+    def reduced_costs(self, rows=slice(None)):
+        return self.costs[rows] - self.u[rows, None] - self.v[None, :]
+
+    def entering(self):
+        """Route with the worst reduced cost in the first row block that has one, or None at optimum."""
+        for _ in range(0, self.m, self.block_rows):
+            start = self.block_start
+            stop = min(start + self.block_rows, self.m)
+            self.block_start = 0 if stop >= self.m else stop
+
+            d = self.reduced_costs(slice(start, stop))
+            np.negative(d, out=d, where=~self.at_upper[start:stop])
+            d[self.basis[start:stop]] = 0
+            k = int(np.argmax(d))
+            if d.flat[k] > self.eps:
+                return start + k // self.n, k % self.n
+        return None
+
+    def pivot(self, i, j):
+        """Push flow around the cycle of (i, j); a route at its upper bound enters by giving flow back."""
+        rows, cols = self.cycle(i, j)
+        decreasing = self.at_upper[i, j]
+        gain = slice(1, None, 2) if decreasing else slice(0, None, 2)
+        lose = slice(0, None, 2) if decreasing else slice(1, None, 2)
+        rows = np.concatenate([rows[gain], rows[lose]])
+        cols = np.concatenate([cols[gain], cols[lose]])
+        n_gain = len(rows) // 2
+
+        room = self.x[rows, cols].copy()
+        if self.upper is None:
+            room[:n_gain] = np.inf
+        else:
+            room[:n_gain] = self.upper[rows[:n_gain], cols[:n_gain]] - room[:n_gain]
+        k = int(np.argmin(room))
+        theta = room[k]
+        self.x[rows[:n_gain], cols[:n_gain]] += theta
+        self.x[rows[n_gain:], cols[n_gain:]] -= theta
+
+        leaving = (int(rows[k]), int(cols[k]))
+        self.x[leaving] = self.upper[leaving] if k < n_gain else 0
+        if leaving == (i, j):
+            self.at_upper[i, j] = not decreasing
+        else:
+            self.at_upper[leaving] = k < n_gain
+            self.at_upper[i, j] = False
+            self.exchange((i, j), leaving)
+        self.iterations += 1
+        return theta
+
+    def exchange(self, entering, leaving):
+        """Swap a basic route for a nonbasic one and update the tree around the cut."""
+        m = self.m
+        p, q = leaving[0], m + leaving[1]
+        child = p if self.parent[p] == q else q
+        subtree = self.subtree(child)
+        self._remove_edge(*leaving)
+
+        i, j = entering
+        inner, outer = (i, m + j) if i in subtree else (m + j, i)
+        self._add_edge(i, j)
+        self._hang(inner, outer)
+
+    def subtree(self, top):
+        """Nodes hanging from top, top included."""
+        nodes = {top}
+        queue = deque([top])
+        while queue:
+            node = queue.popleft()
+            for neighbour in self.adjacency[node]:
+                if neighbour != self.parent[node] and neighbour not in nodes:
+                    nodes.add(neighbour)
+                    queue.append(neighbour)
+        return nodes
+
+    def tree_flows(self):
+        """Basic flows that meet the current supply and demand, solved from the leaves up."""
+        m = self.m
+        need = np.concatenate([self.supply, self.demand])
+        shipped = np.zeros(m + self.n)
+        flows = np.zeros((m, self.n))
+        for node in np.argsort(self.depth, kind="stable")[::-1].tolist():
+            up = self.parent[node]
+            if up < 0:
+                continue
+            flow = need[node] - shipped[node]
+            shipped[up] += flow
+            if node < m:
+                flows[node, up - m] = flow
+            else:
+                flows[up, node - m] = flow
+        return flows
+
+    def dual_solve(self):
+        """Dual simplex on the tree: the basis stays optimal for the costs while negative flows are driven out."""
+        m = self.m
+        self.x = self.tree_flows()
+        while True:
+            rows, cols = np.nonzero(self.basis)
+            flows = self.x[rows, cols]
+            k = int(np.argmin(flows))
+            if flows[k] >= -self.eps:
+                self.x[self.x < 0] = 0
+                return
+            leaving = (int(rows[k]), int(cols[k]))
+            p, q = leaving[0], m + leaving[1]
+            child = p if self.parent[p] == q else q
+
+            inside = np.zeros(m + self.n, dtype=bool)
+            inside[list(self.subtree(child))] = True
+            if child < m:
+                # The cut-off part lacks goods: it must be supplied from outside.
+                senders, receivers = ~inside[:m], inside[m:]
+            else:
+                senders, receivers = inside[:m], ~inside[m:]
+            sender_rows = np.flatnonzero(senders)
+            receiver_cols = np.flatnonzero(receivers)
+            if sender_rows.size == 0 or receiver_cols.size == 0:
+                raise ValueError("Задача не имеет допустимого решения")
+
+            d = self.reduced_costs(sender_rows)[:, receiver_cols]
+            r = int(np.argmin(d))
+            entering = (int(sender_rows[r // receiver_cols.size]), int(receiver_cols[r % receiver_cols.size]))
+            self.exchange(entering, leaving)
+            self.x = self.tree_flows()
+            self.iterations += 1
+
+    def reoptimize(self, costs, supply, demand):
+        """Re-solve from the current basis: dual simplex for new quantities, then primal simplex for new costs."""
+        closed, supply, demand = self._close(np.asarray(costs, dtype=float), supply, demand)
+        if self.upper is None:
+            costs = closed
+            if not (np.array_equal(supply, self.supply) and np.array_equal(demand, self.demand)):
+                self.supply, self.demand = supply, demand
+                self.dual_solve()
+        else:
+            costs = self.costs.copy()
+            costs[:closed.shape[0], :closed.shape[1]] = closed
+
+        changed = costs != self.costs
+        if changed.any():
+            self.costs = costs
+            if (changed & self.basis).any():
+                self._build_tree()
+        self.solve()
+        return self.plan, self.cost
+
+    def sweep(self, delta, t_start, t_end):
+        """Follow the optimal basis while the costs move as costs + (t - t_start) * delta up to t_end.
+
+        The engine must be optimal for the current costs, taken as the costs
+        at t_start. At every breakpoint the routes that became as good as the
+        basic ones are pivoted in, choosing by delta, so the plan that follows
+        is optimal just past the breakpoint. Returns the breakpoints
+        t_start < t_1 < ... < t_end and the closed plan of every piece between
+        them; the cost is linear on each piece.
+        """
+        delta = self._close(np.asarray(delta, dtype=float), np.zeros(self.shape[0]), np.zeros(self.shape[1]))[0]
+        if self.upper is not None:
+            delta = np.pad(delta, ((0, 1), (0, 1)))
+            self._raise_penalty(delta * (t_end - t_start))
+        base = self.costs.copy()
+
+        t = t_start
+        breakpoints, plans = [t], []
+        while True:
+            self._face_pivots(delta)
+            if not plans or not np.array_equal(plans[-1], self.plan):
+                if plans:
+                    breakpoints.append(t)
+                plans.append(self.plan.copy())
+
+            du, dv = self.potentials(delta)
+            dd = delta - du[:, None] - dv[None, :]
+            d = self.reduced_costs()
+            steps = np.full(d.shape, np.inf)
+            rising = ~self.basis & ~self.at_upper & (dd < -self.eps)
+            falling = ~self.basis & self.at_upper & (dd > self.eps)
+            steps[rising] = d[rising] / -dd[rising]
+            steps[falling] = d[falling] / -dd[falling]
+            step = max(steps.min(initial=np.inf), 0)
+            if t + step >= t_end:
+                break
+            t += step
+            self.costs = base + (t - t_start) * delta
+            self._build_tree()
+
+        breakpoints.append(t_end)
+        self.costs = base + (t_end - t_start) * delta
+        self._build_tree()
+        return np.array(breakpoints), plans
+
+    def _face_pivots(self, delta):
+        """Pivot in routes with zero reduced cost that improve delta, keeping the basis optimal."""
+        while True:
+            d = self.reduced_costs()
+            du, dv = self.potentials(delta)
+            dd = delta - du[:, None] - dv[None, :]
+            np.negative(dd, out=dd, where=~self.at_upper)
+            dd[self.basis | (np.abs(d) > self.eps)] = 0
+            k = int(np.argmax(dd))
+            if dd.flat[k] <= self.eps:
+                return
+            self.pivot(k // self.n, k % self.n)
+
+    def _raise_penalty(self, change):
+        """Keep the artificial routes prohibitive for costs moved by up to change."""
+        artificial = np.ones(self.costs.shape, dtype=bool)
+        artificial[:-1, :-1] = False
+        artificial[-1, -1] = False
+        real = self.costs[:-1, :-1]
+        penalty = 1 + 2 * (self.m + self.n) * max(np.abs(real).max(initial=0) + np.abs(change).max(initial=0), 1)
+        if penalty > self.costs[artificial].min():
+            self.costs[artificial] = penalty
+            self._build_tree()
+            self.solve()
+
+    def lower_bound(self):
+        """Dual bound from the current source potentials, the destination ones replaced by their c-transform.
+
+        With route capacities the bound is that of the uncapacitated problem.
+        """
+        m, n = self.m, self.n
+        if self.upper is not None:
+            m, n = m - 1, n - 1
+        u = self.u[:m]
+        v = (self.costs[:m, :n] - u[:, None]).min(axis=0)
+        return float(self.supply[:m] @ u + self.demand[:n] @ v)
+
+    def solve(self, max_iterations=None):
+        while max_iterations is None or self.iterations < max_iterations:
+            cell = self.entering()
+            if cell is None:
+                if self.upper is not None and (np.any(self.x[:-1, -1] > self.eps) or np.any(self.x[-1, :-1] > self.eps)):
+                    raise ValueError("Задача не имеет допустимого решения")
+                break
+            self.pivot(*cell)
+        return self.plan, self.cost
+
+
+def north_west_corner(supply, demand, costs=None):
+    supply = np.array(supply, dtype=float)
+    demand = np.array(demand, dtype=float)
+    plan = np.zeros((supply.size, demand.size))
+    i = j = 0
+    while i < supply.size and j < demand.size:
+        amount = min(supply[i], demand[j])
+        plan[i, j] = amount
+        supply[i] -= amount
+        demand[j] -= amount
+        if supply[i] == 0:
+            i += 1
+        else:
+            j += 1
+    return plan
+
+
+def least_cost(supply, demand, costs):
+    """Matrix-minimum rule: fill the cheapest open route until a row or column is exhausted."""
+    supply = np.array(supply, dtype=float)
+    demand = np.array(demand, dtype=float)
+    open_costs = np.array(costs, dtype=float)
+    open_costs[supply <= 0, :] = np.inf
+    open_costs[:, demand <= 0] = np.inf
+    plan = np.zeros(open_costs.shape)
+    while True:
+        k = int(np.argmin(open_costs))
+        i, j = divmod(k, open_costs.shape[1])
+        if open_costs[i, j] == np.inf:
+            return plan
+        amount = min(supply[i], demand[j])
+        plan[i, j] = amount
+        supply[i] -= amount
+        demand[j] -= amount
+        if supply[i] <= 0:
+            open_costs[i, :] = np.inf
+        if demand[j] <= 0:
+            open_costs[:, j] = np.inf
+
+
+def vogel_approximation(supply, demand, costs):
+    """Vogel's rule: serve the row or column with the largest gap between its two cheapest open routes."""
+    supply = np.array(supply, dtype=float)
+    demand = np.array(demand, dtype=float)
+    costs = np.asarray(costs, dtype=float)
+    plan = np.zeros(costs.shape)
+    rows = np.flatnonzero(supply > 0)
+    cols = np.flatnonzero(demand > 0)
+    while rows.size and cols.size:
+        sub = costs[np.ix_(rows, cols)]
+        row_penalty = _penalties(sub)
+        col_penalty = _penalties(sub.T)
+        if row_penalty.max() >= col_penalty.max():
+            r = int(np.argmax(row_penalty))
+            c = int(np.argmin(sub[r]))
+        else:
+            c = int(np.argmax(col_penalty))
+            r = int(np.argmin(sub[:, c]))
+        i, j = rows[r], cols[c]
+        amount = min(supply[i], demand[j])
+        plan[i, j] = amount
+        supply[i] -= amount
+        demand[j] -= amount
+        if supply[i] <= 0:
+            rows = np.delete(rows, r)
+        if demand[j] <= 0:
+            cols = np.delete(cols, c)
+    return plan
+
+
+def _penalties(sub):
+    if sub.shape[1] == 1:
+        return sub[:, 0]
+    two = np.partition(sub, 1, axis=1)
+    return two[:, 1] - two[:, 0]
+
+
+initial_solutions = {
+    "nwc": north_west_corner,
+    "min_cost": least_cost,
+    "vogel": vogel_approximation,
+}
+
+initial_solution_names = {
+    "nwc": "Северо-западный угол",
+    "min_cost": "Минимальный элемент",
+    "vogel": "Метод Фогеля",
+}
@@ -0,0 +1,261 @@
+import numpy as np
+from scipy import sparse
+from scipy.optimize import OptimizeResult
+from solver_options import SolverOptions
+
+
+def column_bounds(bounds, n):
+    """Lower and upper bound arrays from linprog bounds: one (lower, upper) pair for all or one per column."""
+    if np.shape(bounds) == (2,):
+        bounds = [bounds] * n
+    bounds = np.array(bounds, dtype=object).reshape(n, 2)
+    lower = np.where(bounds[:, 0] == None, -np.inf, bounds[:, 0]).astype(float)
+    upper = np.where(bounds[:, 1] == None, np.inf, bounds[:, 1]).astype(float)
+    return lower, upper
+
+
+class Presolve(object):
+    """Reductions of an LP given in the form of scipy.optimize.linprog, and the way back.
+
+    Every pass removes, for all rows and columns at once: columns with equal
+    bounds, rows left without coefficients, forcing rows (rows that can only
+    hold with all their variables at a bound, like a source with no supply),
+    rows that can never be violated, repeated rows and columns that appear in
+    no row. Passes repeat while they remove something. The removed columns
+    keep their values in self.values; postsolve puts the solution of the
+    reduced problem back among them and postsolve_duals rebuilds row
+    marginals and reduced costs of the whole problem. self.stats counts what
+    was removed. A contradiction found on the way (an empty row asking for a
+    nonzero value, a row out of reach of its variables) sets self.infeasible.
+    With reduce=False the problem is passed on as it is.
+    """
+
+    def __init__(self, c, A_ub=None, b_ub=None, A_eq=None, b_eq=None, bounds=(0, None), tol=1e-9, seed=0, reduce=True):
+        self.c = np.asarray(c, dtype=float).reshape(-1)
+        n = self.c.size
+        blocks = [sparse.csr_matrix(A, shape=(np.shape(A)[0], n)) for A in (A_ub, A_eq) if A is not None and np.shape(A)[0]]
+        self.ub_count = 0 if A_ub is None or not np.shape(A_ub)[0] else np.shape(A_ub)[0]
+        self.A = sparse.vstack(blocks + [sparse.csr_matrix((0, n))], format="csr")
+        self.A.eliminate_zeros()
+        self.rhs = np.concatenate([
+            np.asarray(b, dtype=float).reshape(-1) for b, A in ((b_ub, A_ub), (b_eq, A_eq)) if A is not None and np.shape(A)[0]
+        ] + [np.zeros(0)])
+        self.b = self.rhs.copy()
+        self.equality = np.arange(self.A.shape[0]) >= self.ub_count
+        self.lower, self.upper = column_bounds(bounds, n)
+        self.tol = tol
+        self.rng = np.random.default_rng(seed)
+
+        self.rows = np.ones(self.A.shape[0], dtype=bool)
+        self.columns = np.ones(n, dtype=bool)
+        self.values = np.zeros(n)
+        self.forcing = []
+        self.infeasible = False
+        self.stats = dict.fromkeys((
+            "fixed_columns", "empty_columns", "forced_columns",
+            "empty_rows", "forcing_rows", "redundant_rows", "duplicate_rows", "passes",
+        ), 0)
+        self.stats["rows"] = (self.A.shape[0], None)
+        self.stats["columns"] = (n, None)
+        self.stats["nonzeros"] = (self.A.nnz, None)
+
+        while reduce and not self.infeasible and self._pass():
+            self.stats["passes"] += 1
+        self._reduce()
+
+    def _fix(self, columns, values):
+        """Remove columns at the given values, their part moves to the right-hand sides."""
+        self.values[columns] = values
+        self.columns[columns] = False
+        change = np.zeros(self.c.size)
+        change[columns] = values
+        self.b -= self.A @ change
+
+    def _active(self):
+        """self.A with the removed rows and columns zeroed out."""
+        active = (sparse.diags(self.rows.astype(float)) @ self.A @ sparse.diags(self.columns.astype(float))).tocsr()
+        active.eliminate_zeros()
+        return active
+
+    def _close(self, rows, target):
+        return np.abs(self.b[rows] - target) <= self.tol * np.maximum(1, np.abs(self.b[rows]))
+
+    def _pass(self):
+        before = self.rows.sum() + self.columns.sum()
+
+        fixed = np.flatnonzero(self.columns & (self.lower == self.upper))
+        self._fix(fixed, self.lower[fixed])
+        self.stats["fixed_columns"] += fixed.size
+
+        active = self._active()
+        counts = np.diff(active.indptr)
+        empty = np.flatnonzero(self.rows & (counts == 0))
+        slack = self.b[empty] * np.where(self.equality[empty], -np.sign(self.b[empty]), 1)
+        if (slack < -self.tol * np.maximum(1, np.abs(self.b[empty]))).any():
+            self.infeasible = True
+            return False
+        self.rows[empty] = False
+        self.stats["empty_rows"] += empty.size
+
+        # Lowest and highest values each row can take within the column bounds.
+        positive, negative = active.maximum(0), active.minimum(0)
+        with np.errstate(invalid="ignore"):
+            low = positive @ np.where(self.columns, self.lower, 0) + negative @ np.where(self.columns, self.upper, 0)
+            high = positive @ np.where(self.columns, self.upper, 0) + negative @ np.where(self.columns, self.lower, 0)
+        rows = np.flatnonzero(self.rows)
+        reach = self.tol * np.maximum(1, np.abs(self.b[rows]))
+        if ((low[rows] > self.b[rows] + reach) | (self.equality[rows] & (high[rows] < self.b[rows] - reach))).any():
+            self.infeasible = True
+            return False
+        at_low = rows[self._close(rows, low[rows])]
+        at_high = rows[self.equality[rows] & self._close(rows, high[rows]) & ~self._close(rows, low[rows])]
+        redundant = rows[~self.equality[rows] & (high[rows] <= self.b[rows])]
+        redundant = np.setdiff1d(redundant, at_low)
+        self.rows[redundant] = False
+        self.stats["redundant_rows"] += redundant.size
+        self._force(active, at_low, at_high)
+
+        self._remove_duplicates()
+
+        active = self._active()
+        empty = np.flatnonzero(self.columns & (np.diff(active.tocsc().indptr) == 0))
+        best = np.where(self.c[empty] > 0, self.lower[empty],
+                        np.where(self.c[empty] < 0, self.upper[empty],
+                                 np.where(np.isfinite(self.lower[empty]), self.lower[empty],
+                                          np.where(np.isfinite(self.upper[empty]), self.upper[empty], 0))))
+        bounded = np.isfinite(best)
+        self._fix(empty[bounded], best[bounded])
+        self.stats["empty_columns"] += int(bounded.sum())
+
+        return self.rows.sum() + self.columns.sum() < before
+
+    def _force(self, active, at_low, at_high):
+        """Fix the columns of forcing rows at the bounds their row needs, in row order."""
+        forcing = np.sort(np.concatenate([at_low, at_high]))
+        if not forcing.size:
+            return
+        high = np.isin(forcing, at_high)
+        sub = active[forcing].tocoo()
+        # Each column goes with the first forcing row it is in.
+        order = np.lexsort((sub.row, sub.col))
+        row, col, data = sub.row[order], sub.col[order], sub.data[order]
+        first = np.ones(col.size, dtype=bool)
+        first[1:] = col[1:] != col[:-1]
+        to_upper = (data > 0) == high[row]
+        value = np.where(to_upper, self.upper[col], self.lower[col])
+        # A column that two forcing rows need at different bounds cannot satisfy both.
+        group = np.cumsum(first) - 1
+        if (np.abs(value - value[first][group]) > self.tol).any():
+            self.infeasible = True
+            return
+
+        owner, owned = row[first], col[first]
+        order = np.argsort(owner, kind="stable")
+        groups = np.split(owned[order], np.searchsorted(owner[order], np.arange(1, forcing.size)))
+        self.forcing.extend(zip(forcing, groups, ~high))
+        self.rows[forcing] = False
+        self._fix(col[first], value[first])
+        self.stats["forcing_rows"] += forcing.size
+        self.stats["forced_columns"] += int(first.sum())
+
+    def _remove_duplicates(self):
+        """Rows with the same coefficients: equalities must agree, of the inequalities the tightest one stays."""
+        active = self._active()
+        rows = np.flatnonzero(self.rows)
+        if rows.size < 2:
+            return
+        hashes = active[rows] @ self.rng.random((self.c.size, 2))
+        order = np.lexsort((self.b[rows], hashes[:, 1], hashes[:, 0], self.equality[rows]))
+        rows, hashes = rows[order], hashes[order]
+        same = np.all(hashes[1:] == hashes[:-1], axis=1) & (self.equality[rows[1:]] == self.equality[rows[:-1]])
+        starts = np.flatnonzero(np.concatenate([[True], ~same]))
+        kept = rows[starts[np.cumsum(np.concatenate([[True], ~same])) - 1]]
+        duplicate = rows != kept
+        if not duplicate.any():
+            return
+        rows, kept = rows[duplicate], kept[duplicate]
+        # Random hashes of different rows practically never meet, but make sure.
+        difference = (active[rows] - active[kept]).tocsr()
+        difference.eliminate_zeros()
+        equal = np.diff(difference.indptr) == 0
+        rows, kept = rows[equal], kept[equal]
+        if (self.equality[rows] & ~self._close(rows, self.b[kept])).any():
+            self.infeasible = True
+            return
+        self.rows[rows] = False
+        self.stats["duplicate_rows"] += rows.size
+
+    def _reduce(self):
+        rows, columns = np.flatnonzero(self.rows), np.flatnonzero(self.columns)
+        reduced = self.A[rows][:, columns]
+        equality = self.equality[rows]
+        self.A_ub, self.b_ub = reduced[~equality], self.b[rows[~equality]]
+        self.A_eq, self.b_eq = reduced[equality], self.b[rows[equality]]
+        self.bounds = np.column_stack([self.lower[columns], self.upper[columns]])
+        self.offset = float(self.c[~self.columns] @ self.values[~self.columns])
+        self.stats["rows"] = (self.stats["rows"][0], rows.size)
+        self.stats["columns"] = (self.stats["columns"][0], columns.size)
+        self.stats["nonzeros"] = (self.stats["nonzeros"][0], reduced.nnz)
+
+    @property
+    def reduction(self):
+        """Share of the rows and columns removed."""
+        before = self.stats["rows"][0] + self.stats["columns"][0]
+        after = self.stats["rows"][1] + self.stats["columns"][1]
+        return 1 - after / before if before else 0.0
+
+    def postsolve(self, x):
+        """Solution of the whole problem from one of the reduced problem."""
+        values = self.values.copy()
+        values[self.columns] = x
+        return values
+
+    def postsolve_duals(self, ineqlin, eqlin):
+        """Reduced costs and the marginals of the inequality and equality rows of the whole problem.
+
+        Removed rows get zero, except forcing rows, which get the smallest
+        marginal that keeps the reduced costs of the columns they fixed
+        consistent with the bound those columns are at.
+        """
+        y = np.zeros(self.A.shape[0])
+        rows = np.flatnonzero(self.rows)
+        y[rows[~self.equality[rows]]] = ineqlin
+        y[rows[self.equality[rows]]] = eqlin
+        columns = self.A.tocsc()
+        for row, cols, at_low in reversed(self.forcing):
+            if not cols.size:
+                continue
+            block = columns[:, cols]
+            ratios = (self.c[cols] - block.T @ y) / block[row].toarray().reshape(-1)
+            y[row] = min(0, ratios.min()) if at_low else max(0, ratios.max())
+        reduced_costs = self.c - self.A.T @ y
+        return reduced_costs, y[:self.ub_count], y[self.ub_count:]
+
+    def linprog(self, options=None, method=None):
+        """linprog on the reduced problem, with x, fun and the marginals of the whole problem.
+
+        options is a SolverOptions, method a linprog method name overriding its method.
+        """
+        if self.infeasible:
+            return OptimizeResult(x=None, fun=None, status=2, success=False, message="Presolve: infeasible")
+        if self.columns.any():
+            result = (options or SolverOptions()).linprog(
+                self.c[self.columns], method=method,
+                A_ub=self.A_ub if self.A_ub.shape[0] else None, b_ub=self.b_ub if self.A_ub.shape[0] else None,
+                A_eq=self.A_eq if self.A_eq.shape[0] else None, b_eq=self.b_eq if self.A_eq.shape[0] else None,
+                bounds=self.bounds,
+            )
+            if result.status != 0:
+                if result.x is not None:
+                    result.x, result.fun = self.postsolve(result.x), result.fun + self.offset
+                return result
+            x, fun = result.x, result.fun
+            ineqlin, eqlin = result.ineqlin.marginals, result.eqlin.marginals
+        else:
+            x, fun, ineqlin, eqlin = np.zeros(0), 0.0, np.zeros(0), np.zeros(0)
+        reduced_costs, ineqlin, eqlin = self.postsolve_duals(ineqlin, eqlin)
+        return OptimizeResult(
+            x=self.postsolve(x), fun=fun + self.offset, status=0, success=True, message="Optimal",
+            lower=OptimizeResult(marginals=reduced_costs),
+            ineqlin=OptimizeResult(marginals=ineqlin), eqlin=OptimizeResult(marginals=eqlin),
+        )
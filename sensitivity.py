@@ -0,0 +1,137 @@
+import numpy as np
+
+
+class Sensitivity(object):
+    """Duals and ranging of an optimal transportation basis.
+
+    u[i] and v[j] are the potentials with the fictitious node at zero: the
+    change of the total cost per extra unit of supply at source i or of
+    demand at destination j, the difference going to or coming from the
+    fictitious side. reduced_costs[i, j] is how much cheaper route (i, j)
+    must get before it is worth using. The ranges are intervals of a single
+    cost, supply or demand over which the basis stays optimal, so the what_if
+    methods answer without solving again; they return None outside the range.
+    The ranges are read from the engine tree and hold until the next solve.
+    """
+
+    def __init__(self, engine, lower=None):
+        self.engine = engine
+        m, n = engine.shape
+        self.shape = engine.shape
+        self.plan = engine.plan.copy()
+        self.costs = engine.costs[:m, :n].copy()
+        self.supply = engine.supply[:m].copy()
+        self.demand = engine.demand[:n].copy()
+        if lower is not None:
+            self.plan += lower
+            self.supply += lower.sum(axis=1)
+            self.demand += lower.sum(axis=0)
+        self.cost = float(np.sum(self.plan * self.costs))
+
+        u, v = engine.u.copy(), engine.v.copy()
+        if engine.slack == "column":
+            self.slack_node = engine.m + n
+            shift = -v[n]
+        else:
+            self.slack_node = m
+            shift = u[m]
+        self.all_u, self.all_v = u - shift, v + shift
+        self.u, self.v = self.all_u[:m], self.all_v[:n]
+        self.reduced_costs = self.costs - self.u[:, None] - self.v[None, :]
+
+    def cost_range(self, i, j):
+        """Interval of the cost of route (i, j) over which the plan stays optimal."""
+        engine = self.engine
+        c = self.costs[i, j]
+        d = engine.costs - self.all_u[:, None] - self.all_v[None, :]
+        if not engine.basis[i, j]:
+            return (-np.inf, c - d[i, j]) if engine.at_upper[i, j] else (c - d[i, j], np.inf)
+
+        m = engine.m
+        child = i if engine.parent[i] == m + j else m + j
+        inside = np.zeros(m + engine.n, dtype=bool)
+        inside[list(engine.subtree(child))] = True
+        rows, cols = inside[:m], inside[m:]
+        # Reduced costs of the routes across the cut move by +delta or -delta.
+        sign = rows[:, None].astype(int) - cols[None, :].astype(int)
+        if child < m:
+            sign = -sign
+        sign[engine.basis] = 0
+        upper = engine.at_upper
+
+        low = np.concatenate([-d[(sign > 0) & ~upper], d[(sign < 0) & upper]])
+        high = np.concatenate([d[(sign < 0) & ~upper], -d[(sign > 0) & upper]])
+        return c + min(low.max(initial=-np.inf), 0), c + max(high.min(initial=np.inf), 0)
+
+    def cost_ranges(self):
+        """cost_range of every route as an (m, n, 2) array."""
+        m, n = self.shape
+        ranges = np.empty((m, n, 2))
+        for i in range(m):
+            for j in range(n):
+                ranges[i, j] = self.cost_range(i, j)
+        return ranges
+
+    def supply_range(self, i):
+        """Interval of the supply of source i over which the basis stays feasible."""
+        low, high = self._shift_range(i, self.slack_node, self.engine.slack == "column")
+        return self.supply[i] + low, self.supply[i] + high
+
+    def demand_range(self, j):
+        """Interval of the demand of destination j over which the basis stays feasible."""
+        low, high = self._shift_range(self.slack_node, self.engine.m + j, self.engine.slack == "row")
+        return self.demand[j] + low, self.demand[j] + high
+
+    def what_if_cost(self, i, j, cost):
+        low, high = self.cost_range(i, j)
+        if not low <= cost <= high:
+            return None
+        return self.cost + self.plan[i, j] * (cost - self.costs[i, j])
+
+    def what_if_supply(self, i, amount):
+        low, high = self.supply_range(i)
+        if not low <= amount <= high:
+            return None
+        return self.cost + self.u[i] * (amount - self.supply[i])
+
+    def what_if_demand(self, j, amount):
+        low, high = self.demand_range(j)
+        if not low <= amount <= high:
+            return None
+        return self.cost + self.v[j] * (amount - self.demand[j])
+
+    def _shift_range(self, start, end, totals_change):
+        """Range of delta for delta more units sent along the tree from node start to node end.
+
+        With route capacities a change of the totals also moves the route
+        between the artificial source and destination.
+        """
+        engine = self.engine
+        m = engine.m
+        paths = [(start, end)]
+        if engine.upper is not None and totals_change:
+            paths.append((m - 1, m + engine.n - 1))
+
+        rows, cols, signs = [], [], []
+        for a, b in paths:
+            nodes = engine.path(a, b)
+            for p, q in zip(nodes, nodes[1:]):
+                if p < m:
+                    rows.append(p)
+                    cols.append(q - m)
+                    signs.append(1)
+                else:
+                    rows.append(q)
+                    cols.append(p - m)
+                    signs.append(-1)
+        rows, cols, signs = np.array(rows, dtype=int), np.array(cols, dtype=int), np.array(signs)
+
+        x = engine.x[rows, cols]
+        upper = np.full(x.size, np.inf) if engine.upper is None else engine.upper[rows, cols].copy()
+        if engine.upper is not None:
+            artificial = (rows == m - 1) != (cols == engine.n - 1)
+            upper[artificial] = 0
+        # 0 <= x + sign * delta <= upper on every route of the paths.
+        low = np.where(signs > 0, -x, x - upper)
+        high = np.where(signs > 0, upper - x, x)
+        return min(low.max(initial=-np.inf), 0), max(high.min(initial=np.inf), 0)
@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from ProblemDatabase import ProblemDatabase
+
+
+class SolveCache(object):
+    """Solved plans and objectives keyed by a hash of the problem kind and its numeric inputs.
+
+    The memory tier keeps the most recently used entries up to max_bytes.
+    With db_name the entries are also written to the solve_cache table of
+    that database and read back from it on a memory miss; that table keeps
+    the most recently used entries up to max_db_bytes. get and put may be
+    called from several threads.
+    """
+
+    def __init__(self, max_bytes=64 * 2 ** 20, db_name=None, max_db_bytes=16 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.db_name = db_name
+        self.max_db_bytes = max_db_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._pdb = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(kind, *parts):
+        digest = hashlib.sha256(kind.encode())
+        for part in parts:
+            if part is None or isinstance(part, (str, dict)):
+                digest.update(repr(sorted(part.items()) if isinstance(part, dict) else part).encode())
+            else:
+                # + 0.0 turns -0.0 into 0.0, the same number for the solver.
+                array = np.ascontiguousarray(part, dtype=np.float64) + 0.0
+                digest.update(repr(array.shape).encode())
+                digest.update(array.tobytes())
+            digest.update(b"|")
+        return digest.hexdigest()
+
+    @property
+    def pdb(self):
+        if self._pdb is None and self.db_name is not None:
+            self._pdb = ProblemDatabase(self.db_name, check_same_thread=False)
+        return self._pdb
+
+    def get(self, key):
+        """Copy of the stored (plan, objective), None on a miss."""
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            plan, objective, _ = self.entries[key]
+        elif self.pdb is not None and (stored := self.pdb.read_solution(key)) is not None:
+            plan, objective = stored
+            self._remember(key, plan, objective)
+        else:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return plan.copy(), objective
+
+    def put(self, key, plan, objective):
+        plan = np.array(plan, dtype=np.float64)
+        objective = float(objective)
+        with self.lock:
+            self._remember(key, plan, objective)
+            if self.pdb is not None:
+                self.pdb.save_solution(key, plan, objective, self.max_db_bytes)
+
+    def _remember(self, key, plan, objective):
+        size = plan.nbytes + len(key)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[2]
+        self.entries[key] = (plan, objective, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            self.size -= self.entries.popitem(last=False)[1][2]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+solve_cache = SolveCache(db_name="problems.db")
@@ -1,216 +1,890 @@
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import numpy as np
-from scipy.optimize import linprog
+from scipy import sparse
+from scipy.cluster.vq import kmeans2
+from scipy.sparse.csgraph import connected_components
+from network_simplex import TransportationSimplex, initial_solutions, least_cost
+from sensitivity import Sensitivity
+from presolve import Presolve
+from dispatcher import Dispatcher, engines, features
+from solver_options import SolverOptions
+
+def transport_constraints(m, n, routes=None):
+    """Supply and demand rows of an m x n transportation problem as CSR (2*m*n nonzeros).
+
+    routes (flat indices i * n + j) restricts the columns to those routes.
+    """
+    variables = np.arange(m * n) if routes is None else np.asarray(routes)
+    rows = np.concatenate([variables // n, m + variables % n])
+    cols = np.tile(np.arange(variables.size), 2)
+    data = np.ones(2 * variables.size)
+    return sparse.csr_matrix((data, (rows, cols)), shape=(m + n, variables.size))
+
+def transport_rows(supply, demand, routes=None):
+    """linprog constraint blocks (A_ub, b_ub, A_eq, b_eq); the side with a surplus gets <= rows."""
+    supply = np.asarray(supply, dtype=float)
+    demand = np.asarray(demand, dtype=float)
+    m = supply.size
+    A = transport_constraints(m, demand.size, routes)
+    if supply.sum() > demand.sum():
+        return A[:m], supply, A[m:], demand
+    if supply.sum() < demand.sum():
+        return A[m:], demand, A[:m], supply
+    return None, None, A, np.concatenate([supply, demand])
+
+def staircase_routes(supply, demand):
+    """Flat indices of the north-west corner routes, a feasible support with at most m + n - 1 routes."""
+    supply_ends = np.cumsum(supply)
+    demand_ends = np.cumsum(demand)
+    ends = np.union1d(supply_ends, demand_ends)
+    ends = ends[ends <= min(supply_ends[-1], demand_ends[-1])]
+    middles = (np.concatenate([[0], ends[:-1]]) + ends) / 2
+    middles = middles[middles < ends]
+    rows = np.searchsorted(supply_ends, middles)
+    cols = np.searchsorted(demand_ends, middles)
+    return rows * len(demand) + cols
+
+def close_problem(costs, supply, demand):
+    """Balanced problem with a zero-cost fictitious destination or source taking the difference."""
+    surplus = supply.sum() - demand.sum()
+    closed = np.pad(costs, ((0, int(surplus < 0)), (0, int(surplus > 0))))
+    if surplus > 0:
+        demand = np.append(demand, surplus)
+    elif surplus < 0:
+        supply = np.append(supply, -surplus)
+    return closed, supply, demand
+
+
+def sinkhorn(costs, supply, demand, reg=0.001, tol=1e-4, max_iterations=5000, dtype=np.float64, absorb=1e6, scaling=4):
+    """Entropic plan of a balanced problem rounded to meet supply and demand exactly,
+    with dual feasible potentials f, g and the iteration count; reg is relative to the largest cost."""
+    costs = np.asarray(costs, dtype=float)
+    supply = np.asarray(supply, dtype=float)
+    demand = np.asarray(demand, dtype=float)
+    total = supply.sum()
+    a, b = supply / total, demand / total
+    scale = max(np.abs(costs).max(initial=0), 1e-12)
+
+    f = costs.min(axis=1)
+    g = (costs - f[:, None]).min(axis=0)
+    typed_costs = costs.astype(dtype, copy=False)
+    typed_a, typed_b = a.astype(dtype), b.astype(dtype)
+
+    def kernel():
+        K = np.add.outer(f.astype(dtype), g.astype(dtype))
+        K -= typed_costs
+        K *= dtype(1 / eps)
+        # Subnormal entries would slow every product with K down many times.
+        np.maximum(K, np.log(np.finfo(dtype).tiny) + 1, out=K)
+        return np.exp(K, out=K)
+
+    iterations = 0
+    eps = scale
+    # eps goes down to reg * scale in steps divided by scaling. f, g stay in the
+    # log domain and the scalings u, v are moved into them once they leave
+    # [1 / absorb, absorb], so the kernel never overflows.
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        while True:
+            eps = max(eps / scaling, reg * scale)
+            K = kernel()
+            u = np.ones(a.size, dtype=dtype)
+            v = np.ones(b.size, dtype=dtype)
+            while iterations < max_iterations:
+                iterations += 1
+                Kv = K @ v
+                converged = np.abs(u * Kv - a).sum() <= tol
+                u = typed_a / Kv
+                v = typed_b / (u @ K)
+                if converged or max(u.max(), v.max(), 1 / u.min(), 1 / v.min()) > absorb:
+                    if np.all(np.isfinite(u)) and np.all(np.isfinite(v)):
+                        f += eps * np.log(u.astype(float))
+                        g += eps * np.log(v.astype(float))
+                    if converged:
+                        break
+                    K = kernel()
+                    u = np.ones(a.size, dtype=dtype)
+                    v = np.ones(b.size, dtype=dtype)
+            if eps <= reg * scale or iterations >= max_iterations:
+                break
+
+    plan = kernel().astype(float, copy=False)
+    plan *= np.minimum(a / np.maximum(plan.sum(axis=1), 1e-300), 1)[:, None]
+    plan *= np.minimum(b / np.maximum(plan.sum(axis=0), 1e-300), 1)[None, :]
+    missing_a = a - plan.sum(axis=1)
+    missing_b = b - plan.sum(axis=0)
+    if missing_a.sum() > 0:
+        plan += np.outer(missing_a, missing_b) / missing_a.sum()
+
+    # A c-transform makes the potentials feasible for the dual.
+    g = (costs - f[:, None]).min(axis=0)
+    f = (costs - g[None, :]).min(axis=1)
+    return plan * total, f, g, iterations
+
+def cost_clusters(costs, k, features=64, seed=0):
+    """Labels 0..k'-1 grouping the rows of costs with similar cost profiles.
+
+    The profile of a row is its costs to a random sample of the columns,
+    minus their mean, so rows that differ by a constant cost fall together.
+    Empty clusters are dropped.
+    """
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(costs.shape[1], min(features, costs.shape[1]), replace=False)
+    profiles = costs[:, sample] - costs[:, sample].mean(axis=1, keepdims=True)
+    distinct, inverse = np.unique(profiles, axis=0, return_inverse=True)
+    if k >= distinct.shape[0]:
+        return inverse.reshape(-1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        _, labels = kmeans2(profiles, k, minit="++", seed=rng)
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def disaggregate(coarse, costs, supply, demand, row_labels, col_labels):
+    """Plan for the original routes shipping coarse[p, q] from source group p to destination group q.
+
+    Every destination group first splits what it gets among the source
+    groups, each destination taking from the groups closest to it on
+    average; then the routes of every source group are solved exactly for
+    the amounts it has to deliver. Integral quantities give an integral plan.
+    """
+    groups = sparse.csr_matrix((np.ones(row_labels.size), (row_labels, np.arange(row_labels.size))))
+    group_costs = (groups @ costs) / np.asarray(groups.sum(axis=1))
+    delivered = np.zeros((coarse.shape[0], costs.shape[1]))
+    for q in range(coarse.shape[1]):
+        cols = np.flatnonzero(col_labels == q)
+        delivered[:, cols] = least_cost(coarse[:, q], demand[cols], group_costs[:, cols])
+
+    plan = np.zeros(costs.shape)
+    for p in range(coarse.shape[0]):
+        rows, cols = np.flatnonzero(row_labels == p), np.flatnonzero(delivered[p] > 0)
+        if cols.size:
+            block = TransportationSimplex(costs[np.ix_(rows, cols)], supply[rows], delivered[p, cols])
+            plan[np.ix_(rows, cols)] = block.solve()[0]
+    return plan
+
+
+def check_status(result):
+    """ValueError unless linprog found the optimum."""
+    if result.status == 2:
+        raise ValueError("Задача не имеет допустимого решения")
+    if result.status == 1:
+        raise ValueError("Достигнут предел времени или итераций решения")
+    if result.status != 0:
+        raise ValueError(f"Решение не найдено: {result.message}")
+
+
+def solve_transport_lp(costs, supply, demand, options=None):
+    costs = np.asarray(costs, dtype=float)
+    A_ub, b_ub, A_eq, b_eq = transport_rows(supply, demand)
+    result = (options or SolverOptions()).linprog(costs.reshape(-1), A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=(0, None))
+    check_status(result)
+    return result.x.reshape(costs.shape), result.fun
+
+_batch_model = None
+
+def _set_batch_model(model):
+    global _batch_model
+    _batch_model = model
+
+def _solve_batch_item(c):
+    A_ub, b_ub, A_eq, b_eq, options = _batch_model
+    result = options.linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=(0, None))
+    check_status(result)
+    return result.x, result.fun
+
+def multi_transport_constraints(m, n, p):
+    """Source and destination rows of an m x n x p multi-product problem, variables ordered (i, j, p)."""
+    source_rows = sparse.kron(sparse.eye(m), sparse.kron(np.ones((1, n)), sparse.eye(p)))
+    destination_rows = sparse.kron(np.ones((1, m)), sparse.eye(n * p))
+    return sparse.vstack([source_rows, destination_rows], format="csr")
 
 class Solver(object):
 
-    def __init__(self, s_v, d_v, c_m, time_vector=None, speed_matrix=None, bound_top = None, bound_down = None):
+    def __init__(self, s_v, d_v, c_m, time_vector=None, speed_matrix=None, bound_top = None, bound_down = None, route_capacity=None, route_bounds=None, cache=None, forbidden=None, dispatcher=None, options=None):
         self.supply_vector = s_v
         self.demand_vector = d_v
         self.cost_matrix = c_m
 
         self.time_vector = time_vector
         self.speed_matrix = speed_matrix
-        self.bound_top = bound_top
-        self.bound_down = bound_down
+        self.route_capacity = route_capacity
+        # Boolean mask of routes that cannot be used; infinite costs forbid routes too.
+        self.forbidden = forbidden
+        self.engine = None
+        self.cache = cache
+        self.analysis = None
+        self.dispatcher = dispatcher or Dispatcher()
+        self.options = options or SolverOptions()
+        self.dispatch = None
+
+        # route_bounds maps (source, destination) to (lower, upper), upper None
+        # meaning no limit; bound_down and bound_top are single-route shorthands.
+        self.route_bounds = dict(route_bounds or {})
+        if bound_down:
+            lower, upper = self.route_bounds.get((bound_down[0], bound_down[1]), (0, None))
+            self.route_bounds[(bound_down[0], bound_down[1])] = (bound_down[2], upper)
+        if bound_top:
+            lower, upper = self.route_bounds.get((bound_top[0], bound_top[1]), (0, None))
+            self.route_bounds[(bound_top[0], bound_top[1])] = (lower, bound_top[2])
+
+    @staticmethod
+    def solve_batch(costs, supply, demand, processes=None, cache=None, options=None):
+        """Solve k transportation problems that share supply and demand.
+
+        costs has shape (k, m, n). The constraint matrix is built once and sent
+        once to every worker of the process pool. Returns the plans stacked as
+        (k, m, n) and the vector of k total costs. With a cache only the
+        problems it does not know are solved.
+        """
+        costs = np.asarray(costs, dtype=float)
+        k, m, n = costs.shape
+        options = options or SolverOptions()
+        if cache is not None:
+            keys = [cache.key("transport_batch", supply, demand, c, options.as_dict()) for c in costs]
+            known = [cache.get(key) for key in keys]
+            missing = [i for i in range(k) if known[i] is None]
+            if missing:
+                X, total_costs = Solver.solve_batch(costs[missing], supply, demand, processes, options=options)
+                for i, x, fun in zip(missing, X, total_costs):
+                    cache.put(keys[i], x, fun)
+                    known[i] = x, fun
+            return np.stack([x for x, _ in known]), np.array([fun for _, fun in known])
+
+        model = *transport_rows(supply, demand), options
+        vectors = costs.reshape(k, m * n)
+
+        processes = processes or min(k, os.cpu_count() or 1)
+        if processes <= 1:
+            _set_batch_model(model)
+            results = [_solve_batch_item(c) for c in vectors]
+        else:
+            with ProcessPoolExecutor(processes, initializer=_set_batch_model, initargs=(model,)) as pool:
+                results = list(pool.map(_solve_batch_item, vectors, chunksize=max(1, k // (4 * processes))))
 
-    def solve_transportation_scipy_double(self):
-        supply = self.supply_vector
-        demand = self.demand_vector
-        costs = self.cost_matrix
+        X = np.stack([x for x, _ in results]).reshape(k, m, n)
+        total_costs = np.array([fun for _, fun in results])
+        return X, total_costs
 
-        n_sources = len(supply) 
-        n_destinations = len(demand)
-        n_products = len(supply[0])
+    def solve_transportation_scipy_double(self):
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(
+                "multi_transport", self.supply_vector, self.demand_vector, self.cost_matrix, self.route_capacity, self.options.as_dict()
+            )
+        costs = np.asarray(self.cost_matrix, dtype=float)
+        supply = np.asarray(self.supply_vector, dtype=float)
+        demand = np.asarray(self.demand_vector, dtype=float)
+
+        # One fictitious destination takes every product's surplus and one
+        # fictitious source covers every product's shortage.
+        excess = supply.sum(axis=0) - demand.sum(axis=0)
+        extra_demand = np.maximum(excess, 0)
+        extra_supply = np.maximum(-excess, 0)
 
         info = {
-            "balanced": True
+            "balanced": not excess.any()
+        }
+        if extra_demand.any():
+            info["balanced_demand_items"] = self.__product_items(extra_demand)
+        if extra_supply.any():
+            info["balanced_supply_items"] = self.__product_items(extra_supply)
+
+        if key is not None and (hit := self.cache.get(key)) is not None:
+            return *hit, info
+
+        m, n, n_products = costs.shape
+        n_sources = m + int(extra_supply.any())
+        n_destinations = n + int(extra_demand.any())
+        if (n_sources, n_destinations) != (m, n):
+            costs = np.pad(costs, ((0, n_sources - m), (0, n_destinations - n), (0, 0)))
+            supply = np.vstack([supply, extra_supply])[:n_sources]
+            demand = np.vstack([demand, extra_demand])[:n_destinations]
+
+        capacity = np.full((n_sources, n_destinations), np.inf)
+        if self.route_capacity is not None:
+            route_capacity = np.asarray(self.route_capacity, dtype=float)
+            capacity[:route_capacity.shape[0], :route_capacity.shape[1]] = route_capacity
+        routes = np.flatnonzero(np.isfinite(capacity))
+
+        if routes.size == 0:
+            X, total_cost = self.__solve_products_apart(costs, supply, demand)
+        else:
+            c = costs.reshape(-1)
+            A_eq = multi_transport_constraints(n_sources, n_destinations, n_products)
+            b_eq = np.concatenate([supply.reshape(-1), demand.reshape(-1)])
+            A_ub = sparse.kron(sparse.eye(n_sources * n_destinations, format="csr")[routes], np.ones((1, n_products)))
+            b_ub = capacity.reshape(-1)[routes]
+
+            result = self.options.linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=(0, None))
+            check_status(result)
+            X, total_cost = result.x.reshape((n_sources, n_destinations, n_products)), result.fun
+
+        if key is not None:
+            self.cache.put(key, X, total_cost)
+        return X, total_cost, info
+
+    @staticmethod
+    def __product_items(amounts):
+        return {
+            f"Продукт {p + 1}": int(amounts[p]) if amounts[p].is_integer() else float(amounts[p])
+            for p in np.flatnonzero(amounts)
         }
 
-        for n in range(n_products):
-            supply_n = sum([supply[x][n] for x in range(n_sources)])
-            demand_n = sum([demand[x][n] for x in range(n_destinations)])
-
-            if supply_n > demand_n:
-                info["balanced"] = False
-                if not "balanced_demand_items" in info:
-                    info["balanced_demand_items"] = {}
-                for i in range(len(costs)):
-                    costs[i].append([0 for i in range(n_products)])
-                new_demand = [0 for i in range(n_products)]
-                new_demand[n] = supply_n - demand_n
-                info["balanced_demand_items"][f"Продукт {n+1}"] = supply_n - demand_n
-                demand.append(new_demand)
-                n_destinations += 1
-
-            if supply_n < demand_n:
-                info["balanced"] = False
-                if not "balanced_supply_items" in info:
-                    info["balanced_supply_items"] = {}
-                costs.append([[0 for i in range(n_products)] for j in range(n_destinations)])
-                new_supply = np.zeros(n_products)
-                new_supply[n] = demand_n - supply_n
-                info["balanced_supply_items"][f"Продукт {n+1}"] = demand_n - supply_n
-                supply.append(new_supply)
-                n_sources += 1
-
-        costs = np.array(costs)
-        supply = np.array(supply)
-        demand = np.array(demand)
-
-        c_list = []
-        for i in range(n_sources):
-            for j in range(n_destinations):
-                for p in range(n_products):
-                    c_list.append(costs[i, j, p] if i < 3 else 0)
-
-        c = np.array(c_list)
-
-        num_vars = n_sources * n_destinations * n_products
-        A_eq = []
-        b_eq = []
-
-        for i in range(n_sources):
-            for p in range(n_products):
-                row = np.zeros(num_vars)
-                for j in range(n_destinations):
-                    idx = (i * n_destinations * n_products) + (j * n_products) + p
-                    row[idx] = 1
-                A_eq.append(row)
-                b_eq.append(supply[i, p])
-
-        for j in range(n_destinations):
-            for p in range(n_products):
-                row = np.zeros(num_vars)
-                for i in range(n_sources):
-                    idx = (i * n_destinations * n_products) + (j * n_products) + p
-                    row[idx] = 1
-                A_eq.append(row)
-                b_eq.append(demand[j, p])
-
-        A_eq = np.array(A_eq)
-        b_eq = np.array(b_eq)
-
-        bounds = [(0, None) for _ in range(num_vars)]
-
-        result = linprog(c, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
-        return result.x.reshape((n_sources, n_destinations, n_products)), result.fun, info
-
-    def solve_transportation_scipy(self):
-        if self.bound_top:
-            
-            supply_index = self.bound_top[0]
-            old_supply = self.supply_vector[supply_index]
-            self.supply_vector[supply_index] = self.bound_top[2]        
-            self.supply_vector = np.insert(np.copy(self.supply_vector), supply_index + 1, old_supply - self.bound_top[2])
-
-            row_i = self.cost_matrix[supply_index, :].copy()
-            new_row_for_i_b = row_i.copy()
-            new_row_for_i_b[self.bound_top[1]] = 0
-
-            self.cost_matrix = np.insert(np.copy(self.cost_matrix), supply_index + 1, new_row_for_i_b, axis=0)
-
-        if self.bound_down:
-            self.supply_vector[self.bound_down[0]] -= self.bound_down[2]
-            self.demand_vector[self.bound_down[1]] -= self.bound_down[2]
-
-        a, b, _, C = self.__surplus()
-        if self.bound_top:
-            result = self.nwc_rule()
-            return result[0], result[1]
-
+    def __solve_products_apart(self, costs, supply, demand):
+        """Without joint route capacities every product is its own transportation problem."""
+        n_products = costs.shape[2]
+        with ThreadPoolExecutor(min(n_products, os.cpu_count() or 1)) as pool:
+            parts = list(pool.map(solve_transport_lp, costs.transpose(2, 0, 1), supply.T, demand.T, [self.options] * n_products))
+
+        X = np.stack([x for x, _ in parts], axis=2)
+        return X, sum(fun for _, fun in parts)
+
+    def solve_transportation(self, method="scipy", initial="vogel"):
+        """Plan and total cost; with a cache a problem solved before by the same method is not solved again.
+
+        method "auto" leaves the choice to the dispatcher. self.dispatch
+        records the engine that ran and why, and the time of a real solve
+        goes to the dispatcher. When forbidden routes split the network,
+        every part is solved on its own.
+        """
+        if method == "auto":
+            return self.solve_transportation_auto(initial)
+        self.dispatch = {"engine": method, "reason": "выбран явно", "options": self.options.as_dict()}
+        key = self.__cache_key(method)
+        if key is not None and (hit := self.__restore(key)) is not None:
+            return hit
+
+        start = time.perf_counter()
+        components = self.components()
+        match method:
+            case _ if len(components) > 1:
+                result = self.solve_transportation_components(method, initial, components)
+            case "scipy":
+                result = self.solve_transportation_scipy()
+            case "highs-ds" | "highs-ipm":
+                result = self.solve_transportation_scipy(method)
+            case "network":
+                result = self.solve_transportation_network(initial)
+            case "columns":
+                result = self.solve_transportation_columns()
+            case "sinkhorn":
+                result = self.solve_transportation_sinkhorn()
+            case "multilevel":
+                result = self.solve_transportation_multilevel()
+            case _:
+                raise ValueError(f"Неизвестный метод решения: {method}")
+        self.dispatch["seconds"] = time.perf_counter() - start
+        self.__record(self.dispatch["engine"], self.dispatch["seconds"])
+
+        if key is not None:
+            self.__store(key, *result)
+        return result
+
+    def choose_method(self, exact=True):
+        """Engine the dispatcher would pick for this problem and the reason."""
+        bounded = any(limit is not None for limit in self.route_limits())
+        return self.dispatcher.choose("transport", self.__features(bounded), exact)
+
+    def solve_transportation_auto(self, initial="vogel", exact=True, choice=None):
+        """solve_transportation with the engine picked by the dispatcher, or with choice, an (engine, reason) of choose_method."""
+        engine, reason = choice or self.choose_method(exact)
+        result = self.solve_transportation(engine, initial)
+        # An engine that fell back to the full LP keeps the reason of the fallback.
+        if self.dispatch["engine"] == engine:
+            self.dispatch["reason"] = reason
+        return result
+
+    def __full_lp(self):
+        """The full LP for an engine that does not model route bounds; self.dispatch names the engine that ran."""
+        if self.dispatch is not None:
+            self.dispatch["engine"] = self.options.linprog_method
+            self.dispatch["reason"] = "ограничения на маршруты этим методом не учитываются, решена полная задача"
+        return self.solve_transportation_scipy()
+
+    def __features(self, bounded):
+        return features(self.cost_matrix, self.supply_vector, self.demand_vector, bounded=bounded)
+
+    def __record(self, method, seconds):
+        """Time of a solve for the dispatcher; "scipy" counts as the HiGHS method of the options."""
+        engine = self.options.linprog_method if method == "scipy" else method
+        if engine in engines["transport"]:
+            bounded = any(limit is not None for limit in self.route_limits())
+            self.dispatcher.record("transport", self.__features(bounded), engine, seconds)
+
+    def __cache_key(self, method):
+        if self.cache is None:
+            return None
+        return self.cache.key(
+            "transport", method, self.supply_vector, self.demand_vector, self.cost_matrix,
+            self.time_vector, self.speed_matrix, self.route_capacity, self.route_bounds, self.forbidden,
+            self.options.as_dict()
+        )
+
+    def forbidden_routes(self):
+        """Mask of the routes that cannot be used."""
+        forbidden = ~np.isfinite(np.asarray(self.cost_matrix, dtype=float))
+        if self.forbidden is not None:
+            forbidden |= np.asarray(self.forbidden, dtype=bool)
+        return forbidden
+
+    def components(self):
+        """Sources and destinations of the connected parts of the network of allowed routes.
+
+        A source or destination without allowed routes is a part of its own.
+        """
+        allowed = ~self.forbidden_routes()
+        m, n = allowed.shape
+        if allowed.all():
+            return [(np.arange(m), np.arange(n))]
+        rows, cols = np.nonzero(allowed)
+        graph = sparse.csr_matrix((np.ones(rows.size), (rows, m + cols)), shape=(m + n, m + n))
+        count, labels = connected_components(graph, directed=False)
+        return [(np.flatnonzero(labels[:m] == k), np.flatnonzero(labels[m:] == k)) for k in range(count)]
+
+    def solve_transportation_components(self, method="scipy", initial="vogel", components=None):
+        """Solve every connected part of the network separately, in parallel threads.
+
+        Nothing can move between parts, so the side the whole problem has in
+        excess must be in excess (or balanced) in every part, otherwise the
+        problem has no feasible solution.
+        """
+        a, b, C = self.__balance()
+        components = components or self.components()
+        for rows, cols in components:
+            excess = a[rows].sum() - b[cols].sum()
+            if (self.surplus == "supply" and excess < 0) or (self.surplus == "demand" and excess > 0) or (self.surplus == "equal" and excess != 0):
+                raise ValueError("Задача не имеет допустимого решения")
+
+        parts = [(rows, cols) for rows, cols in components if a[rows].sum() > 0 and b[cols].sum() > 0]
+        with ThreadPoolExecutor(max(1, min(len(parts), os.cpu_count() or 1))) as pool:
+            results = list(pool.map(lambda part: self.__part(*part).solve_transportation(method, initial), parts))
+
+        X = np.zeros(C.shape)
+        for (rows, cols), (plan, _) in zip(parts, results):
+            X[np.ix_(rows, cols)] = plan
+        return X, sum(cost for _, cost in results)
+
+    def __part(self, rows, cols):
+        """Solver of the subproblem on the given sources and destinations."""
+        block = lambda matrix: None if matrix is None else np.asarray(matrix)[np.ix_(rows, cols)]
+        position_rows = {i: k for k, i in enumerate(rows.tolist())}
+        position_cols = {j: k for k, j in enumerate(cols.tolist())}
+        route_bounds = {
+            (position_rows[i], position_cols[j]): bounds for (i, j), bounds in self.route_bounds.items()
+            if i in position_rows and j in position_cols
+        }
+        return Solver(
+            np.asarray(self.supply_vector, dtype=float)[rows], np.asarray(self.demand_vector, dtype=float)[cols],
+            block(self.cost_matrix),
+            time_vector=None if self.time_vector is None else np.asarray(self.time_vector)[rows],
+            speed_matrix=block(self.speed_matrix), route_capacity=block(self.route_capacity),
+            route_bounds=route_bounds, forbidden=block(self.forbidden),
+            cache=self.cache, dispatcher=self.dispatcher, options=self.options,
+        )
+
+    def solve_transportation_progressive(self, initial="vogel", time_budget=None, interval=0.1):
+        """Generator of improving (plan, total cost, gap) of the network method, at most one every
+        interval seconds; gap is 0 once the plan is optimal. Stops there or after time_budget seconds."""
+        start = resumed = time.perf_counter()
+        # Only the time spent solving goes to the dispatcher, not the time the caller holds the generator.
+        working = 0.0
+        key = self.__cache_key("network")
+        if key is not None and (hit := self.__restore(key)) is not None:
+            yield *hit, 0.0
+            return
+        a, b, C, lower, upper = self.__network_problem()
+        shipped = 0.0 if lower is None else np.sum(lower * C)
+        result = lambda plan, cost, gap: (plan if lower is None else plan + lower, cost + shipped, gap)
+
+        if self.engine is not None and self.engine.fits(C, a, b, upper):
+            plan, total_cost = self.engine.reoptimize(C, a, b)
+            self.analysis = Sensitivity(self.engine, lower)
+            self.__record("network", time.perf_counter() - resumed)
+            if key is not None:
+                self.__store(key, *result(plan, total_cost, 0.0)[:2])
+            yield result(plan, total_cost, 0.0)
+            return
+
+        bound = -np.inf
+        plan = None
+        if upper is None:
+            plan = initial_solutions[initial](a, b, C)
+            closed, closed_a, closed_b = close_problem(C, a, b)
+            row_min = closed.min(axis=1)
+            bound = closed_a @ row_min + closed_b @ (closed - row_min[:, None]).min(axis=0)
+            working += time.perf_counter() - resumed
+            yield result(plan, np.sum(plan * C), np.sum(plan * C) - bound)
+            resumed = time.perf_counter()
+
+        engine = self.engine = TransportationSimplex(C, a, b, plan, upper=upper)
+        best = np.inf
+        optimal = False
+        while not optimal:
+            report = time.perf_counter() + interval
+            while True:
+                cell = engine.entering()
+                if cell is None:
+                    optimal = True
+                    break
+                engine.pivot(*cell)
+                if time.perf_counter() >= report:
+                    break
+            if optimal:
+                plan, total_cost = engine.solve()
+                break
+            if time_budget is not None and time.perf_counter() - start >= time_budget:
+                break
+            # With route capacities a plan still using the artificial routes is not feasible.
+            artificial = engine.upper is not None and (
+                np.any(engine.x[:-1, -1] > engine.eps) or np.any(engine.x[-1, :-1] > engine.eps)
+            )
+            if engine.cost < best and not artificial:
+                best = engine.cost
+                # The c-transform of the current potentials bounds the optimum from below.
+                bound = max(bound, engine.lower_bound())
+                working += time.perf_counter() - resumed
+                yield result(engine.plan.copy(), engine.cost, engine.cost - bound)
+                resumed = time.perf_counter()
+
+        if optimal:
+            self.analysis = Sensitivity(engine, lower)
+            self.__record("network", working + time.perf_counter() - resumed)
+            if key is not None:
+                self.__store(key, *result(plan, total_cost, 0.0)[:2])
+            yield result(plan, total_cost, 0.0)
+
+    def solve_transportation_network(self, initial="vogel"):
+        """Transportation simplex started from one of the initial_solutions rules.
+
+        The engine is kept between calls: when the problem keeps its shape the
+        next call re-optimizes from the previous optimal basis (dual simplex for
+        changed supply or demand, primal simplex for changed costs).
+        With route capacities the engine starts from an artificial basis
+        instead. Lower route bounds are shipped up front and the engine solves
+        for the rest.
+        """
+        a, b, C, lower, upper = self.__network_problem()
+        if self.engine is not None and self.engine.fits(C, a, b, upper):
+            plan, total_cost = self.engine.reoptimize(C, a, b)
+        else:
+            plan = None if upper is not None else initial_solutions[initial](a, b, C)
+            self.engine = TransportationSimplex(C, a, b, plan, upper=upper)
+            plan, total_cost = self.engine.solve()
+
+        self.analysis = Sensitivity(self.engine, lower)
+        if lower is not None:
+            return plan + lower, total_cost + np.sum(lower * C)
+        return plan, total_cost
+
+    def solve_transportation_parametric(self, delta, t_start=0.0, t_end=1.0):
+        """Optimal plans for the costs C(t) = cost_matrix + t * delta, t from t_start to t_end.
+
+        One network solve at t_start, then the basis is followed from
+        breakpoint to breakpoint. Returns the breakpoints, the plan optimal on
+        each piece between two of them and the total cost at every breakpoint;
+        the cost is linear in between.
+        """
+        a, b, C, lower, upper = self.__network_problem()
+        delta = np.asarray(delta, dtype=float)
+        plan = None if upper is not None else initial_solutions["vogel"](a, b, C + t_start * delta)
+        self.engine = TransportationSimplex(C + t_start * delta, a, b, plan, upper=upper)
+        self.engine.solve()
+        breakpoints, plans = self.engine.sweep(delta, t_start, t_end)
+
+        if lower is not None:
+            plans = [plan + lower for plan in plans]
+        costs = np.array([np.sum(plan * (C + t * delta)) for plan, t in zip(plans + plans[-1:], breakpoints)])
+        return breakpoints, plans, costs
+
+    def sensitivity(self):
+        """Sensitivity of the last solve, None after methods without an optimal basis."""
+        return self.analysis
+
+    def __potentials(self, res, m):
+        """u and v from the marginals of a transport_rows LP."""
+        eq = res.eqlin.marginals
+        ub = res.ineqlin.marginals
+        y = np.concatenate([eq, ub]) if self.surplus == "demand" else np.concatenate([ub, eq])
+        return y[:m], y[m:]
+
+    def __basis_analysis(self, plan):
+        """Sensitivity of an optimal plan found without the transportation simplex.
+
+        The plan is the start of the engine; being optimal it only needs
+        degenerate pivots to complete a basis tree, which gives the ranges.
+        """
+        a, b, C, lower, upper = self.__network_problem()
+        engine = TransportationSimplex(C, a, b, plan if lower is None else plan - lower, upper=upper)
+        engine.solve()
+        return Sensitivity(engine, lower)
+
+    def __store(self, key, plan, total_cost):
+        """Cache the plan; a trailing 1 marks an optimal plan, whose sensitivity is rebuilt on a hit."""
+        optimal = np.ones(0 if self.analysis is None else 1)
+        self.cache.put(key, np.concatenate([np.reshape(plan, -1), optimal]), total_cost)
+
+    def __restore(self, key):
+        """Cached plan and cost, None on a miss."""
+        hit = self.cache.get(key)
+        if hit is None:
+            return None
+        m, n = self.__balance()[2].shape
+        plan = hit[0][:m * n].reshape((m, n))
+        self.analysis = self.__basis_analysis(plan) if hit[0].size > m * n else None
+        return plan, hit[1]
+
+    def solve_transportation_scipy(self, lp_method=None):
+        """The transportation LP through presolve and HiGHS; lp_method overrides the method of self.options."""
+        a, b, C = self.__balance()
         m, n = C.shape
-        c = C.flatten()
-        
-        A_eq = []
-        for i in range(m):
-            row = np.zeros((m, n))
-            row[i, :] = 1
-            A_eq.append(row.flatten())
-        for j in range(n):
-            col = np.zeros((m, n))
-            col[:, j] = 1
-            A_eq.append(col.flatten())
-        A_eq = np.array(A_eq)
-        b_eq = np.concatenate([a, b])
+        c = C.reshape(-1)
+        A_ub, b_ub, A_eq, b_eq = transport_rows(a, b)
 
         bounds = (0, None)
-        if self.time_vector and self.speed_matrix:
-            tv = np.array(self.time_vector)
-            sm = np.array(self.speed_matrix)
-            bounds = []
-            for row in sm:
-                for i in range(len(row)):
-                    bounds.append((0, tv[i] * row[i]))
-        
-
-        res = linprog(c, A_eq=A_eq, b_eq=b_eq, bounds=bounds)
+        lower, upper = self.route_limits()
+        if lower is not None or upper is not None:
+            bounds = np.column_stack([
+                np.zeros(m * n) if lower is None else lower.reshape(-1),
+                np.full(m * n, np.inf) if upper is None else upper.reshape(-1),
+            ])
+
+        self.presolve = Presolve(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, reduce=self.options.presolve)
+        res = self.presolve.linprog(self.options, lp_method)
+        check_status(res)
         X = res.x.reshape((m, n))
-
-        if self.bound_down:
-            X[self.bound_down[0], self.bound_down[1]] += self.bound_down[2]
+        self.analysis = self.__basis_analysis(X)
 
         total_cost = np.sum(X * C)
         return X, total_cost
 
-    def nwc_rule(self):
-        j = 0
-        i = 0
-        s_v_tmp, d_v_tmp, t_m_tmp, c_m_tmp = self.__surplus()
-
-        print(t_m_tmp)
-
-        while j < d_v_tmp.size and i < s_v_tmp.size:
-            amount = min(d_v_tmp[j], s_v_tmp[i])
-
-            d_v_tmp[j] = d_v_tmp[j] - amount
-            s_v_tmp[i] = s_v_tmp[i] - amount
-            t_m_tmp[i][j] = amount
-
-            if s_v_tmp[i] == 0:
-                i += 1
-            else:
-                j += 1
-
-        total_costs, surplus = self.__costs(t_m_tmp)
-
-        return t_m_tmp, total_costs, surplus
-
-    def __costs(self, transport_matrix):
-        surplus = 0
-        transport_matrix = np.copy(transport_matrix)
-
-        if self.surplus == "demand":
-            surplus = np.sum(transport_matrix[-1, :])
-            surplus = surplus * -1
-            transport_matrix = np.delete(transport_matrix, -1, axis=0)
+    def solve_transportation_columns(self, k=10, chunk_size=2 ** 22, max_columns=None, tol=1e-9):
+        """Column generation: the LP over a subset of routes, grown with the max_columns routes of most
+        negative reduced cost until none is below -tol; self.column_generation holds the certificate."""
+        if any(limit is not None for limit in self.route_limits()):
+            return self.__full_lp()
+        a, b, C = self.__balance()
+        m, n = C.shape
+        rows_per_chunk = max(1, chunk_size // n)
+        max_columns = max_columns or m + n
+        k = min(k, n)
+        # Relative to the largest cost, as the rounding error of the duals is.
+        threshold = tol * max(1.0, np.abs(C).max())
+
+        cheapest = [
+            np.argpartition(C[start:start + rows_per_chunk], k - 1, axis=1)[:, :k]
+            + (np.arange(start, min(start + rows_per_chunk, m)) * n)[:, None]
+            for start in range(0, m, rows_per_chunk)
+        ]
+        # The k cheapest routes of every source, and the north-west corner routes to keep the LP feasible.
+        routes = np.union1d(np.concatenate([c.reshape(-1) for c in cheapest]), staircase_routes(a, b))
+        rounds = 0
+        while True:
+            rounds += 1
+            A_ub, b_ub, A_eq, b_eq = transport_rows(a, b, routes)
+            res = self.options.linprog(C.reshape(-1)[routes], A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=(0, None))
+            check_status(res)
+            u, v = self.__potentials(res, m)
+
+            candidates, reduced, lower_bound = [], [], res.fun
+            min_reduced = np.inf
+            for start in range(0, m, rows_per_chunk):
+                stop = min(start + rows_per_chunk, m)
+                d = C[start:stop] - u[start:stop, None] - v[None, :]
+                negative = np.minimum(d, 0)
+                lower_bound += np.sum(negative * np.minimum(a[start:stop, None], b[None, :]))
+                min_reduced = min(min_reduced, d.min())
+                found = np.flatnonzero(d < -threshold)
+                # Routes already in the subset cannot improve it; a round with nothing new ends the loop.
+                found = found[~np.isin(found + start * n, routes)]
+                if found.size > max_columns:
+                    found = found[np.argpartition(d.reshape(-1)[found], max_columns)[:max_columns]]
+                candidates.append(found + start * n)
+                reduced.append(d.reshape(-1)[found])
+
+            candidates = np.concatenate(candidates)
+            if candidates.size == 0:
+                break
+            if candidates.size > max_columns:
+                candidates = candidates[np.argpartition(np.concatenate(reduced), max_columns)[:max_columns]]
+            routes = np.union1d(routes, candidates)
+
+        X = np.zeros(m * n)
+        X[routes] = res.x
+        self.analysis = self.__basis_analysis(X.reshape((m, n)))
+        # With no reduced cost below -threshold the duals are feasible for the full
+        # problem and the plan is optimal; stalled says the loop ended without that.
+        # lower_bound is b.y + sum(min(d, 0) * min(a_i, b_j)) of the last pricing round.
+        self.column_generation = {
+            "u": u,
+            "v": v,
+            "lower_bound": lower_bound,
+            "min_reduced_cost": min_reduced,
+            "tolerance": threshold,
+            "stalled": bool(min_reduced < -threshold),
+            "rounds": rounds,
+            "routes": routes.size,
+        }
+        return X.reshape((m, n)), res.fun
 
-        if self.surplus == "supply":
-            surplus = np.sum(transport_matrix[:, -1])
-            transport_matrix = np.delete(transport_matrix, -1, axis=1)
+    def solve_transportation_sinkhorn(self, reg=0.001, tol=1e-4, max_iterations=5000, dtype=np.float64):
+        """Near-optimal feasible plan from sinkhorn; self.sinkhorn holds the dual lower bound and the gap to it."""
+        if any(limit is not None for limit in self.route_limits()):
+            return self.__full_lp()
+        a, b, C = self.__balance()
+        m, n = C.shape
+        closed, a, b = close_problem(C, a, b)
+
+        # Sources and destinations without goods would only put log(0) into the potentials.
+        rows, cols = np.flatnonzero(a > 0), np.flatnonzero(b > 0)
+        if rows.size < a.size or cols.size < b.size:
+            plan, f, g, iterations = sinkhorn(closed[np.ix_(rows, cols)], a[rows], b[cols], reg, tol, max_iterations, dtype)
+            X = np.zeros(closed.shape)
+            X[np.ix_(rows, cols)] = plan
+        else:
+            X, f, g, iterations = sinkhorn(closed, a, b, reg, tol, max_iterations, dtype)
+        X = X[:m, :n]
 
-        tmp = np.multiply(transport_matrix, self.cost_matrix)
+        total_cost = np.sum(X * C)
+        lower_bound = a[rows] @ f + b[cols] @ g
+        self.sinkhorn = {
+            "lower_bound": lower_bound,
+            "gap": total_cost - lower_bound,
+            "iterations": iterations,
+        }
+        return X, total_cost
 
-        return tmp.sum(), surplus
+    def solve_transportation_multilevel(self, clusters=None, max_iterations=None, seed=0):
+        """Plan of a coarse problem over clusters of similar sources and destinations, refined by the network engine.
 
-    def __surplus(self):
-        s_v_tmp = np.copy(self.supply_vector)
-        d_v_tmp = np.copy(self.demand_vector)
-        t_m_tmp = np.copy(np.zeros((s_v_tmp.size, d_v_tmp.size)))
-        c_m_tmp = np.copy(self.cost_matrix)
+        clusters is an int for both sides or a pair; max_iterations caps the refining pivots.
+        """
+        if any(limit is not None for limit in self.route_limits()):
+            return self.__full_lp()
+        a, b, C = self.__balance()
+        m, n = C.shape
+        if clusters is None:
+            # About the square root of the number of sources and of destinations.
+            clusters = int(np.ceil(np.sqrt(m))), int(np.ceil(np.sqrt(n)))
+        elif np.ndim(clusters) == 0:
+            clusters = clusters, clusters
+        row_labels = cost_clusters(C, clusters[0], seed=seed)
+        col_labels = cost_clusters(C.T, clusters[1], seed=seed)
+
+        rows = sparse.csr_matrix((np.ones(m), (row_labels, np.arange(m))))
+        cols = sparse.csr_matrix((np.ones(n), (col_labels, np.arange(n))))
+        counts = np.outer(rows.sum(axis=1), cols.sum(axis=1))
+        coarse_costs = (rows @ (cols @ C.T).T) / counts
+        coarse_a, coarse_b = rows @ a, cols @ b
+        coarse = TransportationSimplex(coarse_costs, coarse_a, coarse_b,
+                                       initial_solutions["vogel"](coarse_a, coarse_b, coarse_costs))
+        coarse_plan, _ = coarse.solve()
+
+        # The coarse plan spread over the original routes is the start of the exact engine.
+        start = disaggregate(coarse_plan, C, a, b, row_labels, col_labels)
+        self.engine = TransportationSimplex(C, a, b, start)
+        plan, total_cost = self.engine.solve(max_iterations)
+        if max_iterations is None or self.engine.iterations < max_iterations:
+            self.analysis = Sensitivity(self.engine)
+        self.multilevel = {
+            "clusters": (int(row_labels.max()) + 1, int(col_labels.max()) + 1),
+            "start_cost": float(np.sum(start * C)),
+            "cost": total_cost,
+            "lower_bound": self.engine.lower_bound(),
+            "pivots": self.engine.iterations,
+        }
+        return plan, total_cost
+
+    def capacities(self):
+        """Upper bound of every route: time available at the source times the route speed,
+        limited by route_capacity; None when routes are unbounded."""
+        capacities = None
+        if self.time_vector is not None and self.speed_matrix is not None:
+            capacities = np.asarray(self.time_vector, dtype=float)[:, None] * np.asarray(self.speed_matrix, dtype=float)
+        if self.route_capacity is not None:
+            route_capacity = np.asarray(self.route_capacity, dtype=float)
+            capacities = route_capacity if capacities is None else np.minimum(capacities, route_capacity)
+        return capacities
+
+    def route_limits(self):
+        """Lower and upper bound matrices of the routes, None where no route has one.
+
+        Forbidden routes get an upper bound of zero.
+        """
+        lower = None
+        upper = self.capacities()
+        forbidden = self.forbidden_routes()
+        if forbidden.any():
+            upper = np.full(forbidden.shape, np.inf) if upper is None else upper.copy()
+            upper[forbidden] = 0
+        if not self.route_bounds:
+            return lower, upper
+
+        shape = np.shape(self.cost_matrix)
+        rows, cols = np.array(list(self.route_bounds.keys())).T
+        limits = np.array([
+            (low, np.inf if high is None else high) for low, high in self.route_bounds.values()
+        ], dtype=float)
+
+        if limits[:, 0].any():
+            lower = np.zeros(shape)
+            lower[rows, cols] = limits[:, 0]
+        if np.isfinite(limits[:, 1]).any():
+            upper = np.full(shape, np.inf) if upper is None else upper.copy()
+            upper[rows, cols] = np.minimum(upper[rows, cols], limits[:, 1])
+        if lower is not None and upper is not None and (lower > upper).any():
+            raise ValueError("Нижняя граница перевозки больше верхней")
+        return lower, upper
+
+    def initial_solution(self, rule="nwc"):
+        """Plan of a construction rule, its cost and the surplus (supply minus demand, left unshipped)."""
+        if rule not in initial_solutions:
+            raise ValueError(f"Неизвестное правило начального плана: {rule}")
+        a, b, C = self.__balance()
+        plan = initial_solutions[rule](a, b, C)
+
+        return plan, np.sum(plan * C), a.sum() - b.sum()
 
-        if np.sum(s_v_tmp) > np.sum(d_v_tmp):
-            d_v_tmp = np.append(d_v_tmp, np.sum(s_v_tmp) - np.sum(d_v_tmp))
-            new_column_tmp = np.zeros((s_v_tmp.size, 1))
-            t_m_tmp = np.append(t_m_tmp, new_column_tmp, axis=1)
-            c_m_tmp = np.append(c_m_tmp, new_column_tmp, axis=1)
+    def nwc_rule(self):
+        return self.initial_solution("nwc")
+
+    def vogel_rule(self):
+        return self.initial_solution("vogel")
+
+    def min_cost_rule(self):
+        return self.initial_solution("min_cost")
+
+    def __network_problem(self):
+        """Quantities left after the lower route bounds are shipped, with the bounds themselves."""
+        a, b, C = self.__balance()
+        lower, upper = self.route_limits()
+        if lower is not None:
+            a = a - lower.sum(axis=1)
+            b = b - lower.sum(axis=0)
+            if upper is not None:
+                upper = upper - lower
+            if (a < 0).any() or (b < 0).any():
+                raise ValueError("Задача не имеет допустимого решения")
+        return a, b, C, lower, upper
+
+    def __balance(self):
+        """Input arrays; self.surplus tells which side has more than the other needs."""
+        self.analysis = None
+        a = np.asarray(self.supply_vector, dtype=float)
+        b = np.asarray(self.demand_vector, dtype=float)
+        C = np.asarray(self.cost_matrix, dtype=float)
+        forbidden = self.forbidden_routes()
+        if forbidden.any():
+            # A finite stand-in for the construction rules and the cost sums;
+            # the upper bound of zero keeps the exact methods off these routes.
+            C = np.where(forbidden, 1 + 2 * sum(C.shape) * max(np.abs(C[~forbidden]).max(initial=0), 1), C)
+        if a.sum() > b.sum():
             self.surplus = "supply"
-        elif np.sum(s_v_tmp) < np.sum(d_v_tmp):
-            s_v_tmp = np.append(s_v_tmp, np.sum(d_v_tmp) - np.sum(s_v_tmp))
-            new_row_t_tmp = np.zeros((1, d_v_tmp.size))
-            t_m_tmp = np.append(t_m_tmp, new_row_t_tmp, axis=0)
-            c_m_tmp = np.append(c_m_tmp, new_row_t_tmp, axis=0)
+        elif a.sum() < b.sum():
             self.surplus = "demand"
         else:
             self.surplus = "equal"
 
-        return s_v_tmp, d_v_tmp, t_m_tmp, c_m_tmp
\ No newline at end of file
+        return a, b, C
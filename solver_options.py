@@ -0,0 +1,75 @@
+import warnings
+from scipy.optimize import OptimizeWarning, linprog
+
+# HiGHS starts its thread pool once per process; a later solve asking for
+# another thread count would fail, so it runs with the pool already there.
+_threads_started = None
+
+
+class SolverOptions(object):
+    """HiGHS settings of the LP solves.
+
+    method is "ds" (dual simplex), "ipm" (interior point) or "auto" (HiGHS
+    decides, or the dispatcher where there is one). threads None leaves the
+    HiGHS default; more than one thread also turns on the parallel dual
+    simplex. The first solve of the process fixes the size of the HiGHS
+    thread pool. time_limit is in seconds of wall-clock time, None for no limit.
+    Tolerances left at None keep the HiGHS defaults.
+    """
+
+    methods = {"ds": "highs-ds", "ipm": "highs-ipm", "auto": "highs"}
+
+    def __init__(self, method="auto", threads=None, presolve=True, time_limit=None,
+                 primal_feasibility_tolerance=None, dual_feasibility_tolerance=None, ipm_optimality_tolerance=None):
+        if method not in self.methods:
+            raise ValueError(f"Неизвестный метод HiGHS: {method}")
+        self.method = method
+        self.threads = threads
+        self.presolve = presolve
+        self.time_limit = time_limit
+        self.primal_feasibility_tolerance = primal_feasibility_tolerance
+        self.dual_feasibility_tolerance = dual_feasibility_tolerance
+        self.ipm_optimality_tolerance = ipm_optimality_tolerance
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    @property
+    def linprog_method(self):
+        return self.methods[self.method]
+
+    def linprog_options(self):
+        options = {"presolve": self.presolve}
+        for name in ("time_limit", "primal_feasibility_tolerance", "dual_feasibility_tolerance", "ipm_optimality_tolerance"):
+            if getattr(self, name) is not None:
+                options[name] = getattr(self, name)
+        if self.threads is not None:
+            if _threads_started in (None, self.threads):
+                options["threads"] = self.threads
+            options["parallel"] = self.threads > 1
+        return options
+
+    def highs_options(self, method=None):
+        """The same settings as HiGHS option names and values; method is a linprog method name."""
+        solver = {"highs-ds": "simplex", "highs-ipm": "ipm", "highs": "choose"}[method or self.linprog_method]
+        options = {"solver": solver, "presolve": "on" if self.presolve else "off"}
+        if solver == "simplex":
+            options["simplex_strategy"] = 1
+        for name in ("time_limit", "primal_feasibility_tolerance", "dual_feasibility_tolerance", "ipm_optimality_tolerance"):
+            if getattr(self, name) is not None:
+                options[name] = float(getattr(self, name))
+        if self.threads is not None:
+            options["threads"] = self.threads
+            options["parallel"] = "on" if self.threads > 1 else "off"
+        return options
+
+    def linprog(self, c, method=None, **problem):
+        """scipy.optimize.linprog with these settings; method overrides self.method with a linprog method name."""
+        with warnings.catch_warnings():
+            # threads and parallel are not linprog options, scipy passes them on to HiGHS as they are.
+            warnings.filterwarnings("ignore", "Unrecognized options", OptimizeWarning)
+            result = linprog(c, method=method or self.linprog_method, options=self.linprog_options(), **problem)
+        global _threads_started
+        if _threads_started is None:
+            _threads_started = self.threads or 0
+        return result